@@ -1,5 +1,23 @@
-import data from "../../../results/cleaned_data.json"
+import { promises as fs } from "fs"
+import path from "path"
+
+const RESULTS = path.join(process.cwd(), "results")
+
+// Read the current published version on every request (see model/snapshots.py).
+// Versions are written once and swapped in by rename, so a read never sees a
+// half-written file.
+export const dynamic = "force-dynamic"
+
+async function currentFile() {
+  try {
+    const manifest = JSON.parse(await fs.readFile(path.join(RESULTS, "cleaned_data.manifest.json"), "utf8"))
+    return path.join(RESULTS, manifest.current.file)
+  } catch {
+    return path.join(RESULTS, "cleaned_data.json")
+  }
+}
 
 export async function GET() {
+  const data = JSON.parse(await fs.readFile(await currentFile(), "utf8"))
   return Response.json(data)
 }
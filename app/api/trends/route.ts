@@ -0,0 +1,57 @@
+import { promises as fs } from "fs"
+import path from "path"
+import { NextRequest } from "next/server"
+
+const RESULTS = path.join(process.cwd(), "results")
+
+// Precomputed by `python -m model trends`; read the current published version.
+// Series list only non-empty buckets (a missing date means count 0).
+//   ?granularity=day|week  (default day)
+//   ?group=STATE|LOB       (default "*|*", the rollup; "*" = every state / LOB)
+//   ?start=YYYY-MM-DD&end=YYYY-MM-DD
+export const dynamic = "force-dynamic"
+
+type Row = { start: string }
+type Trends = {
+  groups: string[][]
+  day: Record<string, Row[]>
+  week: Record<string, Row[]>
+  sliding: Record<string, Row[]>
+}
+
+function inRange(rows: Row[] = [], start: string | null, end: string | null) {
+  return rows.filter((r) => (!start || r.start >= start) && (!end || r.start <= end))
+}
+
+export async function GET(request: NextRequest) {
+  const params = request.nextUrl.searchParams
+  const granularity = params.get("granularity") === "week" ? "week" : "day"
+  const group = params.get("group") || "*|*"
+  const start = params.get("start")
+  const end = params.get("end")
+
+  let file = path.join(RESULTS, "trends.json")
+  try {
+    const manifest = JSON.parse(await fs.readFile(path.join(RESULTS, "trends.manifest.json"), "utf8"))
+    file = path.join(RESULTS, manifest.current.file)
+  } catch {}
+
+  let data: Trends
+  try {
+    data = JSON.parse(await fs.readFile(file, "utf8"))
+  } catch {
+    return Response.json({ groups: [], granularity, group, series: [], sliding: {} })
+  }
+
+  const sliding: Record<string, Row[]> = {}
+  for (const [days, rows] of Object.entries(data.sliding)) {
+    sliding[days] = inRange(rows, start, end)
+  }
+  return Response.json({
+    groups: data.groups,
+    granularity,
+    group,
+    series: inRange(data[granularity][group], start, end),
+    sliding,
+  })
+}
@@ -0,0 +1,51 @@
+"""
+Underwriting scoring pipeline: appetite rules, risk scores, reranking,
+LLM explanations and account aggregation.
+
+Run it with ``python -m model <command>`` (see model/cli.py). Names below
+are re-exported lazily, so ``import model`` stays cheap and only the
+submodule that defines a name is imported when it is first used.
+"""
+import importlib
+
+_EXPORTS = {
+    "appetite_score": "model",
+    "is_in_appetite": "model",
+    "filter_policies": "model",
+    "appetite_breakdown": "model",
+    "calculate_risk_score": "risk_score",
+    "risk_factors": "risk_score",
+    "risk_contributions": "risk_score",
+    "factor_matrix": "risk_score",
+    "score_scenarios": "risk_score",
+    "WEIGHT_PROFILES": "risk_score",
+    "aggregate_accounts": "accounts",
+    "AccountState": "account_state",
+    "AccountBook": "account_state",
+    "cascade_rerank": "cascade",
+    "explain": "explanations",
+    "bm25_scores": "lexical_rank",
+    "BM25Index": "lexical_rank",
+    "rerank_with_fallback": "rerank",
+    "rerank_guideline_sets": "multi_guidelines",
+    "RerankGateway": "rerank_gateway",
+    "get_client": "cohere_client",
+    "GUIDELINES": "guidelines",
+    "GUIDELINE_SETS": "guidelines",
+    "policy_yaml": "policy_docs",
+    "PolicyIndex": "policy_index",
+    "publish": "snapshots",
+    "JobQueue": "job_queue",
+    "PolicyStore": "policy_store",
+    "TrendWindows": "trends",
+    "ScoreSketches": "quantiles",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        module = importlib.import_module(f".{_EXPORTS[name]}", __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,236 @@
+"""
+Fuzzy account resolution: map spelling variants of the same insured to one
+canonical account id.
+
+Names are normalized and cut into character shingles, summarized with
+MinHash, and bucketed with LSH banding, so only names that share a bucket
+are ever compared (near-linear instead of all pairs). Candidate pairs whose
+estimated Jaccard similarity clears the threshold are unioned; each cluster
+takes its most common spelling as the canonical name. Missing, non-string or
+blank names are logged and left unresolved: each becomes its own account.
+"""
+import hashlib
+import re
+import zlib
+from collections import Counter, defaultdict
+
+SHINGLE_SIZE = 3
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs around Jaccard 0.5 start to collide
+THRESHOLD = 0.6  # estimated Jaccard needed to merge a candidate pair
+MAX_BUCKET = 50  # larger buckets are chained instead of compared all-pairs
+
+_SEED = 1
+
+_PUNCT = re.compile(r"[^a-z0-9]+")
+# Legal-form suffixes that don't distinguish insureds
+_SUFFIXES = {"inc", "llc", "ltd", "corp", "corporation", "co", "company", "plc", "lp", "llp"}
+
+
+def normalize(name):
+    """'Northeast Reinsurance Inc.' -> 'northeast reinsurance'."""
+    tokens = _PUNCT.sub(" ", (name or "").lower()).split()
+    while len(tokens) > 1 and tokens[-1] in _SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def shingles(norm, k=SHINGLE_SIZE):
+    """
+    Character k-grams of a normalized name, padded so short names still shingle.
+    Repeats are kept: they don't change a MinHash.
+    """
+    padded = f" {norm} "
+    if len(padded) <= k:
+        return [padded]
+    return [padded[i:i + k] for i in range(len(padded) - k + 1)]
+
+
+def account_id(norm):
+    """Stable id for a canonical (normalized) name."""
+    return "acct_" + hashlib.blake2b(norm.encode("utf-8"), digest_size=6).hexdigest()
+
+
+def _resolvable(name):
+    return isinstance(name, str) and bool(normalize(name))
+
+
+def unresolved_id(name):
+    """Stable id for a name resolution skipped; it is never merged with anything."""
+    return "unresolved_" + hashlib.blake2b(repr(name).encode("utf-8"), digest_size=6).hexdigest()
+
+
+def lookup(mapping, name):
+    """account_id for a raw name from resolve_accounts()'s mapping (unresolved_id if it was skipped)."""
+    return mapping[name] if _resolvable(name) else unresolved_id(name)
+
+
+# ---------------------------
+# MinHash + LSH
+# ---------------------------
+def minhash_signatures(shingle_sets, num_perm=NUM_PERM, seed=_SEED):
+    """
+    names×num_perm MinHash matrix. Shingles are dictionary-encoded once, each
+    distinct shingle is hashed by content (so signatures don't depend on input
+    order), and all names are hashed together, one vectorized pass per permutation.
+    """
+    import numpy as np
+
+    vocab = defaultdict()
+    vocab.default_factory = vocab.__len__
+    codes = np.fromiter((vocab[s] for sh in shingle_sets for s in sh), dtype=np.int64)
+    shingle_hash = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in vocab), dtype=np.uint64, count=len(vocab))
+    ids = shingle_hash[codes]
+    lengths = np.fromiter((len(sh) for sh in shingle_sets), dtype=np.int64, count=len(shingle_sets))
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    # Multiply-shift hashing: (a*x + b mod 2**64) >> 32 with odd a, no modulo pass needed
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+
+    sig = np.empty((len(shingle_sets), num_perm), dtype=np.uint32)
+    hashed = np.empty_like(ids)
+    for j in range(num_perm):
+        np.multiply(ids, a[j], out=hashed)
+        hashed += b[j]
+        hashed >>= np.uint64(32)
+        sig[:, j] = np.minimum.reduceat(hashed, offsets)
+    return sig
+
+
+def candidate_pairs(sig, bands=BANDS, max_bucket=MAX_BUCKET):
+    """(m, 2) array of index pairs i < j that share at least one LSH band bucket."""
+    import numpy as np
+
+    n, num_perm = sig.shape
+    rows = num_perm // bands
+    # Odd multiplier per row; uint64 overflow wraps, which is fine for bucketing
+    mix = (np.arange(rows, dtype=np.uint64) * np.uint64(2) + np.uint64(0x9E3779B97F4A7C15))
+    pairs = []
+    for band in range(bands):
+        keys = (sig[:, band * rows:(band + 1) * rows].astype(np.uint64) * mix).sum(axis=1)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        sizes = np.diff(np.r_[starts, n])
+
+        # Pairs of 2 (the common case) in one shot
+        two = starts[sizes == 2]
+        pairs.append(np.stack([order[two], order[two + 1]], axis=1))
+
+        for s, size in zip(starts[sizes > 2].tolist(), sizes[sizes > 2].tolist()):
+            members = order[s:s + size]
+            if size <= max_bucket:
+                i, j = np.triu_indices(size, k=1)
+                pairs.append(np.stack([members[i], members[j]], axis=1))
+            else:
+                pairs.append(np.stack([members[:-1], members[1:]], axis=1))
+
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.concatenate(pairs)
+    return np.unique(np.sort(pairs, axis=1), axis=0)
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def cluster_names(norms, threshold=THRESHOLD, num_perm=NUM_PERM, bands=BANDS):
+    """Cluster index (root) for each normalized name."""
+    parent = list(range(len(norms)))
+    if len(norms) < 2:
+        return parent
+
+    sig = minhash_signatures([shingles(n) for n in norms], num_perm=num_perm)
+    pairs = candidate_pairs(sig, bands=bands)
+    # Estimated Jaccard = share of agreeing MinHash slots, checked in chunks
+    for start in range(0, len(pairs), 100_000):
+        chunk = pairs[start:start + 100_000]
+        similar = (sig[chunk[:, 0]] == sig[chunk[:, 1]]).mean(axis=1) >= threshold
+        for i, j in chunk[similar].tolist():
+            ri, rj = _find(parent, i), _find(parent, j)
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)
+    return [_find(parent, i) for i in range(len(norms))]
+
+
+# ---------------------------
+# Resolution
+# ---------------------------
+def resolve_accounts(names, threshold=THRESHOLD):
+    """
+    Resolve raw account names (an iterable, repeats count as usage).
+    Returns (mapping, accounts):
+      mapping  {raw name: account_id}
+      accounts {account_id: {"account_name": canonical spelling, "aliases": [raw names]}}
+    Missing or malformed names are skipped: they are not in mapping, and accounts
+    lists each under its unresolved_id with "unresolved": True (see lookup).
+    """
+    counts = Counter()
+    skipped = {}
+    for name in names:
+        if _resolvable(name):
+            counts[name] += 1
+        else:
+            skipped.setdefault(unresolved_id(name), name)
+    if skipped:
+        print(f"Account resolution: left {len(skipped)} missing or malformed account names unresolved "
+              f"({', '.join(repr(n) for n in list(skipped.values())[:5])})")
+
+    # Exact matches after normalization never need LSH
+    by_norm = defaultdict(list)
+    for raw in counts:
+        by_norm[normalize(raw)].append(raw)
+    norms = list(by_norm)
+    roots = cluster_names(norms, threshold=threshold)
+
+    clusters = defaultdict(list)
+    for norm, root in zip(norms, roots):
+        clusters[root].extend(by_norm[norm])
+
+    mapping = {}
+    accounts = {}
+    for raws in clusters.values():
+        # Most used spelling wins; first seen breaks ties
+        canonical = max(raws, key=lambda r: counts[r])
+        acc_id = account_id(normalize(canonical))
+        accounts[acc_id] = {"account_name": canonical, "aliases": sorted(raws)}
+        for raw in raws:
+            mapping[raw] = acc_id
+    for acc_id, name in skipped.items():
+        accounts[acc_id] = {"account_name": "" if name is None else str(name), "aliases": [], "unresolved": True}
+    return mapping, accounts
+
+
+def annotate(policies, threshold=THRESHOLD):
+    """Set account_id on every policy; returns the accounts table of resolve_accounts()."""
+    mapping, accounts = resolve_accounts((p.get("account_name") for p in policies), threshold=threshold)
+    for p in policies:
+        p["account_id"] = lookup(mapping, p.get("account_name"))
+    return accounts
+
+
+def main(input_path="results/data.json", output_path="results/account_resolution.json", threshold=THRESHOLD):
+    import json
+
+    with open(input_path, "r") as f:
+        policies = json.load(f)["output"][0]["data"]
+
+    mapping, accounts = resolve_accounts((p.get("account_name") for p in policies), threshold=threshold)
+    with open(output_path, "w") as f:
+        json.dump({"mapping": mapping, "accounts": accounts}, f, indent=2)
+
+    merged = {k: v for k, v in accounts.items() if len(v["aliases"]) > 1}
+    print(f"{len(mapping)} account names -> {len(accounts)} accounts ({len(merged)} merged)")
+    for acc in merged.values():
+        print(f"  {acc['account_name']}: {', '.join(acc['aliases'])}")
+    print(f"Saved {output_path}")
+
+
+if __name__ == "__main__":
+    main()
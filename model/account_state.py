@@ -0,0 +1,216 @@
+import heapq
+import math
+
+from .risk_score import calculate_risk_score
+
+# Running sums are rebuilt exactly (fsum) after this many updates, so repeated
+# add/subtract doesn't let floating-point error creep into the aggregates.
+RESYNC_EVERY = 10_000
+
+
+class AccountState:
+    """
+    One account's aggregates, maintained as policies are inserted, rescored
+    or removed, instead of being recomputed over every policy.
+
+    avg/weighted scores come from running sums (O(1) per update); max_score
+    uses a max-heap with lazy deletion (O(log n) amortized). Values match
+    accounts.aggregate_account() for the same policies, up to summation
+    order in the last rounded digit.
+    """
+
+    def __init__(self, risk_fn=calculate_risk_score):
+        self.risk_fn = risk_fn
+        self.policies = {}
+        self._terms = {}  # id -> (score, premium, risk, risk weight, heap seq)
+        self._heap = []   # (-score, seq, id); stale when seq no longer matches _terms
+        self._seq = 0
+        self._updates = 0
+        self._resync()
+
+    @classmethod
+    def from_policies(cls, policies, risk_fn=calculate_risk_score):
+        state = cls(risk_fn)
+        for p in policies:
+            state.upsert(p)
+        return state
+
+    def __len__(self):
+        return len(self.policies)
+
+    def __contains__(self, policy_id):
+        return policy_id in self.policies
+
+    # ---------------------------
+    # Updates
+    # ---------------------------
+    def upsert(self, policy):
+        """Insert a policy, or replace it if its id is already in the account."""
+        pid = policy["id"]
+        if pid in self._terms:
+            self._subtract(self._terms[pid])
+
+        score = policy["cohere_relevance"]
+        premium = policy.get("total_premium", 1)
+        terms = (score, premium, self.risk_fn(policy), policy.get("total_premium", 1) or 1, self._seq)
+        self._seq += 1
+
+        self.policies[pid] = policy
+        self._terms[pid] = terms
+        self._add(terms)
+        heapq.heappush(self._heap, (-score, terms[4], pid))
+        self._updated()
+
+    def remove(self, policy_id):
+        """Drop a policy; returns it (KeyError if it isn't in the account)."""
+        policy = self.policies.pop(policy_id)
+        self._subtract(self._terms.pop(policy_id))
+        self._updated()
+        return policy
+
+    def _add(self, terms):
+        score, premium, risk, risk_weight, _ = terms
+        self._n += 1
+        self._score_sum += score
+        self._premium_sum += premium
+        self._weighted_score_sum += score * premium
+        self._risk_sum += risk
+        self._weighted_risk_sum += risk * risk_weight
+
+    def _subtract(self, terms):
+        score, premium, risk, risk_weight, _ = terms
+        self._n -= 1
+        self._score_sum -= score
+        self._premium_sum -= premium
+        self._weighted_score_sum -= score * premium
+        self._risk_sum -= risk
+        self._weighted_risk_sum -= risk * risk_weight
+
+    def _updated(self):
+        self._updates += 1
+        if self._updates >= RESYNC_EVERY:
+            self._resync()
+        # Too many stale heap entries: rebuild it from the live policies
+        if len(self._heap) > 2 * len(self._terms) + 32:
+            self._heap = [(-t[0], t[4], pid) for pid, t in self._terms.items()]
+            heapq.heapify(self._heap)
+
+    def _resync(self):
+        terms = list(self._terms.values())
+        self._n = len(terms)
+        self._score_sum = math.fsum(t[0] for t in terms)
+        self._premium_sum = math.fsum(t[1] for t in terms)
+        self._weighted_score_sum = math.fsum(t[0] * t[1] for t in terms)
+        self._risk_sum = math.fsum(t[2] for t in terms)
+        self._weighted_risk_sum = math.fsum(t[2] * t[3] for t in terms)
+        self._updates = 0
+
+    # ---------------------------
+    # Aggregates
+    # ---------------------------
+    @property
+    def max_score(self):
+        heap = self._heap
+        while heap:
+            neg_score, seq, pid = heap[0]
+            terms = self._terms.get(pid)
+            if terms is not None and terms[4] == seq:
+                return -neg_score
+            heapq.heappop(heap)
+        return None
+
+    def _weighted_score(self):
+        avg = self._score_sum / self._n
+        return self._weighted_score_sum / self._premium_sum if self._premium_sum else avg
+
+    def summary(self):
+        """The account-level fields of the enhanced output (without "policies")."""
+        if not self._n:
+            return None
+        avg_risk_score = self._risk_sum / self._n
+        weighted_risk_score = (
+            self._weighted_risk_sum / self._premium_sum if self._premium_sum > 0 else avg_risk_score
+        )
+        return {
+            "avg_score": round(self._score_sum / self._n, 3),
+            "max_score": round(self.max_score, 3),
+            "weighted_score": round(self._weighted_score(), 3),
+            "avg_risk_score": round(avg_risk_score, 2),
+            "weighted_risk_score": round(weighted_risk_score, 2),
+        }
+
+    def policy_entry(self, policy_id):
+        """One policy as it appears in the account's "policies" map."""
+        p = self.policies[policy_id]
+        score, _, risk, _, _ = self._terms[policy_id]
+        return {
+            **p,
+            "cohere_relevance": score,
+            "score": round((score + self._weighted_score()) / 2, 3),
+            "risk_score": risk,
+            "justification_points": p.get("justification_points", []),
+            "references": p.get("references", [])
+        }
+
+    def entry(self):
+        """
+        Full account entry, as aggregate_account() would build it, with policies
+        ordered by cohere_relevance (best first). O(n): every policy's score
+        depends on the account's weighted score.
+        """
+        if not self._n:
+            return None
+        ranked = sorted(self.policies, key=lambda pid: self._terms[pid][0], reverse=True)
+        return {
+            **self.summary(),
+            "policies": {pid: self.policy_entry(pid) for pid in ranked},
+        }
+
+
+class AccountBook:
+    """AccountState per account, routing each policy update to its account."""
+
+    def __init__(self, risk_fn=calculate_risk_score, key="account_name"):
+        self.risk_fn = risk_fn
+        self.key = key
+        self.accounts = {}
+        self._account_of = {}
+
+    @classmethod
+    def from_policies(cls, policies, risk_fn=calculate_risk_score, key="account_name"):
+        book = cls(risk_fn, key)
+        for p in policies:
+            book.upsert(p)
+        return book
+
+    def get(self, account):
+        return self.accounts.get(account)
+
+    def upsert(self, policy):
+        """Insert or rescore a policy; returns the account keys it touched (old and new)."""
+        pid = policy["id"]
+        account = policy[self.key]
+        touched = {account}
+        previous = self._account_of.get(pid)
+        if previous is not None and previous != account:
+            self._remove_from(previous, pid)
+            touched.add(previous)
+
+        if account not in self.accounts:
+            self.accounts[account] = AccountState(self.risk_fn)
+        self.accounts[account].upsert(policy)
+        self._account_of[pid] = account
+        return touched
+
+    def remove(self, policy_id):
+        """Drop a policy; returns the account key it belonged to (None if unknown)."""
+        account = self._account_of.pop(policy_id, None)
+        if account is not None:
+            self._remove_from(account, policy_id)
+        return account
+
+    def _remove_from(self, account, policy_id):
+        state = self.accounts[account]
+        state.remove(policy_id)
+        if not len(state):
+            del self.accounts[account]
@@ -0,0 +1,65 @@
+from collections import defaultdict
+
+from .risk_score import calculate_risk_score
+
+
+def aggregate_account(plist, risk_fn=calculate_risk_score):
+    """
+    Account-level scores for one account's policies (each needs cohere_relevance).
+    Returns the account entry of the enhanced output, with its "policies" map.
+    """
+    scores = [p["cohere_relevance"] for p in plist]
+    premiums = [p.get("total_premium", 1) for p in plist]
+    avg = sum(scores) / len(scores)
+    mx = max(scores)
+    wavg = sum(s * pr for s, pr in zip(scores, premiums)) / sum(premiums)
+
+    # Compute policy-level scores + risk scores
+    policies_obj = {}
+    policy_risk_scores = []
+    weighted_risk_sum = 0
+    total_premium = sum(premiums)
+
+    for p in plist:
+        indiv_score = (p["cohere_relevance"] + wavg) / 2
+        risk_score = risk_fn(p)
+        policy_risk_scores.append(risk_score)
+        weighted_risk_sum += risk_score * (p.get("total_premium", 1) or 1)
+
+        policies_obj[p["id"]] = {
+            **p,
+            "cohere_relevance": p["cohere_relevance"],
+            "score": round(indiv_score, 3),
+            "risk_score": risk_score,
+            "justification_points": p.get("justification_points", []),
+            "references": p.get("references", [])
+        }
+
+    # Account-level aggregated risk scores
+    avg_risk_score = sum(policy_risk_scores) / len(policy_risk_scores)
+    weighted_risk_score = weighted_risk_sum / total_premium if total_premium > 0 else avg_risk_score
+
+    return {
+        "avg_score": round(avg, 3),
+        "max_score": round(mx, 3),
+        "weighted_score": round(wavg, 3),
+        "avg_risk_score": round(avg_risk_score, 2),
+        "weighted_risk_score": round(weighted_risk_score, 2),
+        "policies": policies_obj
+    }
+
+
+def group_by_account(policies, key="account_name"):
+    """Group policies by key ("account_id" once account_resolution.annotate() has run)."""
+    accounts = defaultdict(list)
+    for p in policies:
+        accounts[p[key]].append(p)
+    return accounts
+
+
+def aggregate_accounts(policies, risk_fn=calculate_risk_score, key="account_name"):
+    """{account key: account entry} for every account in policies (order preserved)."""
+    return {
+        acc: aggregate_account(plist, risk_fn)
+        for acc, plist in group_by_account(policies, key).items()
+    }
@@ -1,18 +1,15 @@
 import json
 
-# -------------------
-# Load data
-# -------------------
-with open("model/data.json", "r") as f:
-    data = json.load(f)
+# Numeric cutoffs of filter_in_appetite (see threshold_sweep for tuning them)
+MIN_TIV = 10_000_000
+MAX_LOSS_RATIO = 0.7
+MIN_BUILDING_YEAR = 1950
 
-# Get policies list
-policies = data["output"][0]["data"]
 
 # -------------------
 # Basic Filter Function
 # -------------------
-def filter_in_appetite(policies):
+def filter_in_appetite(policies, min_tiv=MIN_TIV, max_loss_ratio=MAX_LOSS_RATIO, min_building_year=MIN_BUILDING_YEAR):
     in_appetite = []
     out_appetite = []
 
@@ -29,7 +26,7 @@ def filter_in_appetite(policies):
                 continue
 
             # TIV must be >= 10M
-            if p.get("tiv", 0) < 10_000_000:
+            if p.get("tiv", 0) < min_tiv:
                 out_appetite.append(p)
                 continue
 
@@ -39,7 +36,7 @@ def filter_in_appetite(policies):
                 continue
 
             # Building must be >= 1950
-            if p.get("oldest_building", 2100) < 1950:
+            if p.get("oldest_building", 2100) < min_building_year:
                 out_appetite.append(p)
                 continue
 
@@ -48,7 +45,7 @@ def filter_in_appetite(policies):
                 loss_ratio = float(p.get("loss_value", 0)) / float(p.get("total_premium", 1))
             except Exception:
                 loss_ratio = 1.0
-            if loss_ratio >= 0.7:
+            if loss_ratio >= max_loss_ratio:
                 out_appetite.append(p)
                 continue
 
@@ -125,25 +122,41 @@ def appetite_score(policy):
 
     return round(score, 2)
 
-# -------------------
-# Apply Filters & Scoring
-# -------------------
-in_appetite, out_appetite = filter_in_appetite(policies)
+def main(input_path="model/data.json"):
+    # -------------------
+    # Load data
+    # -------------------
+    with open(input_path, "r") as f:
+        data = json.load(f)
 
-# Add appetite scores to all policies
-for p in policies:
-    p["appetite_score"] = appetite_score(p)
+    # Get policies list
+    policies = data["output"][0]["data"]
 
-# Sort in-appetite by score
-in_appetite_sorted = sorted(in_appetite, key=lambda x: x["appetite_score"], reverse=True)
+    # -------------------
+    # Apply Filters & Scoring
+    # -------------------
+    in_appetite, out_appetite = filter_in_appetite(policies)
+
+    # Add appetite scores to all policies
+    for p in policies:
+        p["appetite_score"] = appetite_score(p)
+
+    # Sort in-appetite by score
+    in_appetite_sorted = sorted(in_appetite, key=lambda x: x["appetite_score"], reverse=True)
+
+    # -------------------
+    # Example Outputs
+    # -------------------
+    print("In-Appetite Policies (Top 5 by score):")
+    for p in in_appetite_sorted[:5]:
+        print(f"- ID {p['id']} | Score {p['appetite_score']} | {p['account_name']}")
+
+    print("\nOut-of-Appetite Policies (sample):")
+    for p in out_appetite[:5]:
+        print(f"- ID {p['id']} | {p['account_name']}")
+
+    return in_appetite_sorted, out_appetite
 
-# -------------------
-# Example Outputs
-# -------------------
-print("In-Appetite Policies (Top 5 by score):")
-for p in in_appetite_sorted[:5]:
-    print(f"- ID {p['id']} | Score {p['appetite_score']} | {p['account_name']}")
 
-print("\nOut-of-Appetite Policies (sample):")
-for p in out_appetite[:5]:
-    print(f"- ID {p['id']} | {p['account_name']}")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+from .model import appetite_score
+from .risk_score import calculate_risk_score
+from .policy_docs import policy_yaml
+
+
+def local_score(policy):
+    """
+    Cheap local score (0–1) used to decide which policies are worth a remote rerank.
+    Policies that fail a hard appetite rule (appetite_score == 0) score 0;
+    everything else blends the rule score with the risk score.
+    """
+    appetite = appetite_score(policy)
+    if appetite == 0:
+        return 0.0
+    return round(0.5 * appetite / 100 + 0.5 * calculate_risk_score(policy) / 100, 4)
+
+
+def cascade_rerank(policies, query, rerank_fn, top_m=50, threshold=0.0):
+    """
+    Score every policy locally, then send only the best candidates to the reranker.
+
+    A policy is a candidate when its local score is > 0 and >= threshold; at most
+    top_m candidates (highest local score first) are reranked. top_m=None means no cap.
+    rerank_fn(query, documents) must return (scores, engine) with scores aligned
+    with documents.
+
+    Sets on every policy:
+    - "local_score": the local score
+    - "cohere_relevance": rerank score for candidates, local score for the rest
+    - "relevance_engine": the engine rerank_fn reported ("cohere" or "lexical"),
+      "local" if pruned
+
+    Returns the reranked candidates by cohere_relevance (highest first), then the
+    pruned policies by local score: a local score is not on the rerank scale, so
+    a pruned policy never outranks a reranked one.
+    """
+    for p in policies:
+        p["local_score"] = local_score(p)
+
+    candidates = [p for p in policies if p["local_score"] > 0 and p["local_score"] >= threshold]
+    candidates.sort(key=lambda x: x["local_score"], reverse=True)
+    if top_m is not None:
+        candidates = candidates[:top_m]
+
+    for p in policies:
+        p["cohere_relevance"] = p["local_score"]
+        p["relevance_engine"] = "local"
+
+    scores, engine = rerank_fn(query, [policy_yaml(p) for p in candidates])
+    for p, s in zip(candidates, scores):
+        p["cohere_relevance"] = s
+        p["relevance_engine"] = engine
+
+    print(f"Cascade: reranked {len(candidates)} of {len(policies)} policies, "
+          f"{len(policies) - len(candidates)} kept their local score")
+
+    return sorted(
+        policies,
+        key=lambda x: (x["relevance_engine"] != "local", x["cohere_relevance"], x["local_score"]),
+        reverse=True,
+    )
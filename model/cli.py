@@ -0,0 +1,384 @@
+"""
+Single entry point for the pipeline: python -m model <command> [options]
+
+Each command imports only the modules it needs, so local commands
+(score, group, scenarios) never load the Cohere SDK. Run with --timing to
+see how long the command's imports took and which heavy packages loaded.
+"""
+import argparse
+import importlib
+import json
+import sys
+import time
+
+HEAVY_MODULES = ("cohere", "httpx", "yaml", "numpy", "scipy", "boto3")
+
+DATA = "results/data.json"
+ENHANCED = "results/enhanced_data.json"
+CLEANED = "results/cleaned_data.json"
+
+
+_import_seconds = 0.0
+
+
+def _load(module):
+    """Import a pipeline module on demand, keeping track of the time spent importing."""
+    global _import_seconds
+    start = time.perf_counter()
+    try:
+        return importlib.import_module(f".{module}", __package__)
+    finally:
+        _import_seconds += time.perf_counter() - start
+
+
+def cmd_score(args):
+    calculate_risk_score = _load("risk_score").calculate_risk_score
+    appetite_score = _load("model").appetite_score
+    explanations = _load("explanations") if args.explain else None
+
+    with open(args.input, "r") as f:
+        policies = json.load(f)["output"][0]["data"]
+
+    rows = []
+    for p in policies:
+        appetite = appetite_score(p)
+        rows.append({
+            "id": p["id"],
+            "appetite_score": appetite,
+            "in_appetite": appetite > 0,
+            "risk_score": calculate_risk_score(p),
+        })
+        if explanations:
+            breakdown = explanations.score_breakdown(p)
+            rows[-1]["score_breakdown"] = breakdown
+            rows[-1]["justification_points"] = explanations.explain(p, breakdown)
+
+    in_appetite = sum(r["in_appetite"] for r in rows)
+    print(f"In-Appetite: {in_appetite} policies")
+    print(f"Out-of-Appetite: {len(rows) - in_appetite} policies")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"policies": rows}, f, indent=2)
+        print(f"Saved {args.output}")
+
+
+def cmd_rerank(args):
+    _load("cohere_mixed").rerank_top(args.input, top=args.top)
+
+
+def cmd_explain(args):
+    _load("cohere_mixed").explain_top(args.input, top=args.top)
+
+
+def cmd_aggregate(args):
+    emit_file = open(args.emit, "w") if args.emit else None
+
+    def on_item(policy, field, item):
+        # One NDJSON line per completed point / reference, flushed for tailing consumers
+        emit_file.write(json.dumps({"policy": policy["id"], "field": field, "item": item}) + "\n")
+        emit_file.flush()
+
+    try:
+        _load("cohere_aggregate").run(
+            args.input, args.output, top=args.top, profile=args.profile,
+            cascade=args.cascade, cascade_top_m=args.cascade_top_m,
+            cascade_threshold=args.cascade_threshold, resolve=args.resolve,
+            reuse=args.reuse, reuse_features=args.reuse_features.split(","), reuse_cap=args.reuse_cap,
+            narrate=not args.no_narrate, token_ceiling=args.token_ceiling,
+            stream=not args.no_stream, on_item=on_item if emit_file else None, keep=args.keep,
+        )
+    finally:
+        if emit_file:
+            emit_file.close()
+
+
+def cmd_group(args):
+    _load("data_grouper").main(
+        args.input, args.output, max_records=args.max_records, resolve=args.resolve,
+    )
+
+
+def cmd_resolve(args):
+    _load("account_resolution").main(args.input, args.output, threshold=args.threshold)
+
+
+SWEEP_AXES = ("min_tiv", "max_tiv", "max_loss_ratio", "max_loss_value",
+              "min_building_year", "min_premium", "max_premium")
+
+
+def cmd_sweep(args):
+    thresholds = {
+        axis: [float(v) for v in getattr(args, axis).split(",")]
+        for axis in SWEEP_AXES if getattr(args, axis)
+    }
+    _load("threshold_sweep").main(args.input, args.output, base=args.base, **thresholds)
+
+
+INDEX_FIELDS = ("tiv", "total_premium", "oldest_building", "effective_date", "expiration_date", "term_days")
+
+
+def cmd_index(args):
+    policy_index = _load("policy_index")
+    ranges = {}
+    for field in INDEX_FIELDS:
+        bounds = getattr(args, field)
+        if bounds:
+            lo, _, hi = bounds.partition(":")
+            ranges[field] = (policy_index.parse_bound(field, lo), policy_index.parse_bound(field, hi))
+    policy_index.main(args.input, **ranges)
+
+
+def cmd_jobs(args):
+    job_queue = _load("job_queue")
+    queue = job_queue.JobQueue(args.db)
+    if args.action == "submit":
+        options = {"top": args.top, "profile": args.profile, "narrate": not args.no_narrate, "reuse": args.reuse}
+        job_id = queue.submit(args.input, args.output, args.guidelines, **options)
+        print(f"Queued job {job_id}: {args.input} -> {args.output}")
+        ahead = [j["id"] for j in queue.jobs() if j["status"] in ("queued", "running")
+                 and j["output_path"] == args.output and j["id"] != job_id]
+        if ahead:
+            print(f"  runs after job(s) {ahead}, which write the same output")
+    elif args.action == "run":
+        job_queue.main(args.db, args.workers)
+    else:
+        job_queue.print_jobs(queue)
+
+
+def cmd_store(args):
+    policy_store = _load("policy_store")
+    if args.action == "load":
+        policy_store.main(args.paths or policy_store.DEFAULT_FILES, args.db)
+        return
+    store = policy_store.PolicyStore(args.db)
+    if args.action == "export":
+        if args.layout == "raw":
+            data = store.export_raw()
+        elif args.layout == "grouped":
+            data = store.export_grouped()
+        else:
+            data = store.export_enhanced(args.dataset)
+        if args.output:
+            _load("snapshots").publish(args.output, data, indent=4)
+            print(f"Published {args.output}")
+        else:
+            print(json.dumps(data, indent=2))
+    else:
+        rows = store.query(args.dataset, account_name=args.account, state=args.state,
+                           line_of_business=args.lob, min_score=args.min_score, limit=args.limit)
+        for p in rows:
+            score = f" | score {p['score']}" if args.dataset else ""
+            print(f"- ID {p['id']} | {p.get('account_name')} | {p.get('primary_risk_state')} | "
+                  f"{p.get('line_of_business')}{score}")
+    store.close()
+
+
+def cmd_trends(args):
+    _load("trends").main(args.input, args.output, prune=args.prune)
+
+
+def cmd_quantiles(args):
+    quantiles = _load("quantiles")
+    if args.merge:
+        merged = quantiles.merge_files(args.merge, args.output)
+        print(f"Merged {len(args.merge)} sketch files -> {args.output}")
+        view = merged.view()
+    else:
+        quantiles.main(args.input, k=args.k)
+        return
+    for group, metrics in sorted(view[args.dimension].items()):
+        line = " | ".join(f"{m} p50 {v['p50']} p90 {v['p90']} p99 {v['p99']}" for m, v in metrics.items())
+        print(f"- {group}: {line}")
+
+
+def cmd_snapshots(args):
+    _load("snapshots").main(args.path)
+
+
+def cmd_scenarios(args):
+    _load("risk_score").main(args.input, args.output)
+
+
+def cmd_guidelines(args):
+    _load("multi_guidelines").main(args.input, args.sets, args.output)
+
+
+def cmd_watch(args):
+    _load("watch").main(args.input, args.output)
+
+
+def cmd_serve(args):
+    _load("service").main(args.accounts, args.port)
+
+
+def cmd_dynamo_load(args):
+    _load("dynamo_sink").main(args.input, args.endpoint_url)
+
+
+def cmd_dynamo_scan(args):
+    _load("dynamo_source").main(args.endpoint_url, args.segments)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m model", description="Underwriting scoring pipeline")
+    parser.add_argument("--timing", action="store_true",
+                        help="report import/run time and which heavy packages were loaded")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("score", help="local appetite + risk scores (no API calls)")
+    p.add_argument("--input", default=DATA)
+    p.add_argument("--output")
+    p.add_argument("--explain", action="store_true", help="add per-factor breakdowns and template explanations")
+    p.set_defaults(func=cmd_score)
+
+    for name, func, help_text in (
+        ("rerank", cmd_rerank, "rank policies against the guidelines and print the top N"),
+        ("explain", cmd_explain, "rank, then ask the LLM why the top N fit the guidelines"),
+    ):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--input", default=DATA)
+        p.add_argument("--top", type=int, default=5)
+        p.set_defaults(func=func)
+
+    p = sub.add_parser("aggregate", help="full pipeline: rerank, explain, aggregate by account")
+    p.add_argument("--input", default=DATA)
+    p.add_argument("--output", default=ENHANCED)
+    p.add_argument("--top", type=int, help="keep only the top N ranked policies")
+    p.add_argument("--profile", default="default", help="risk weight profile (see risk_score.WEIGHT_PROFILES)")
+    p.add_argument("--cascade", action="store_true", help="prune locally before rerank")
+    p.add_argument("--cascade-top-m", type=int, default=50)
+    p.add_argument("--cascade-threshold", type=float, default=0.0)
+    p.add_argument("--resolve", action="store_true", help="merge spelling variants of account names")
+    p.add_argument("--reuse", action="store_true", help="share templated justifications within feature buckets")
+    p.add_argument("--reuse-features", default="state,line_of_business,construction,tiv_band,loss_ratio_band",
+                   help="comma-separated signature features (see justification_cache.FEATURES)")
+    p.add_argument("--reuse-cap", type=int, default=50, help="policies served per generation (1 = no reuse)")
+    p.add_argument("--no-narrate", action="store_true",
+                   help="template explanations only (no chat calls; rerank still runs)")
+    p.add_argument("--token-ceiling", type=int, default=1024, help="max estimated input tokens per chat request")
+    p.add_argument("--no-stream", action="store_true", help="wait for whole chat replies instead of streaming")
+    p.add_argument("--emit", help="append each justification point / reference to this NDJSON file as it completes")
+    p.add_argument("--keep", type=int, default=3, help="published versions of the output to retain")
+    p.set_defaults(func=cmd_aggregate)
+
+    p = sub.add_parser("group", help="group policies by account")
+    p.add_argument("--input", default=DATA)
+    p.add_argument("--output", default="results/grouped_policies.json")
+    p.add_argument("--max-records", type=int, default=50_000,
+                   help="policies held in memory before spilling a sorted run to disk")
+    p.add_argument("--resolve", action="store_true", help="merge spelling variants of account names")
+    p.set_defaults(func=cmd_group)
+
+    p = sub.add_parser("resolve", help="fuzzy-match account names to canonical account ids")
+    p.add_argument("--input", default=DATA)
+    p.add_argument("--output", default="results/account_resolution.json")
+    p.add_argument("--threshold", type=float, default=0.6, help="estimated Jaccard needed to merge two names")
+    p.set_defaults(func=cmd_resolve)
+
+    p = sub.add_parser("scenarios", help="risk scores under every weight profile")
+    p.add_argument("--input", default=DATA)
+    p.add_argument("--output", default="results/risk_scenarios.json")
+    p.set_defaults(func=cmd_scenarios)
+
+    p = sub.add_parser("sweep", help="policy count / premium for every combination of appetite cutoffs")
+    p.add_argument("--input", default=DATA)
+    p.add_argument("--output", default="results/threshold_sweep.json")
+    p.add_argument("--base", choices=("solver", "model", "none"), default="solver",
+                   help="categorical rules applied before sweeping")
+    for axis in SWEEP_AXES:
+        p.add_argument("--" + axis.replace("_", "-"), dest=axis, help="comma-separated cutoffs")
+    p.set_defaults(func=cmd_sweep)
+
+    p = sub.add_parser("index", help="build range/date indexes next to a results file, optionally query them")
+    p.add_argument("--input", default=ENHANCED)
+    for field in INDEX_FIELDS:
+        p.add_argument("--" + field.replace("_", "-"), dest=field, metavar="LO:HI",
+                       help="inclusive range; either side may be empty (dates also accept today+N)")
+    p.set_defaults(func=cmd_index)
+
+    p = sub.add_parser("jobs", help="queue aggregate runs over many drops and run them with a worker pool")
+    p.add_argument("action", choices=["submit", "run", "list"])
+    p.add_argument("--db", default="results/jobs.sqlite")
+    p.add_argument("--input", default=DATA)
+    p.add_argument("--output", default=ENHANCED)
+    p.add_argument("--guidelines", default="default", help="guideline set name, text file, or literal text")
+    p.add_argument("--top", type=int)
+    p.add_argument("--profile", default="default")
+    p.add_argument("--no-narrate", action="store_true")
+    p.add_argument("--reuse", action="store_true")
+    p.add_argument("--workers", type=int, default=4)
+    p.set_defaults(func=cmd_jobs)
+
+    p = sub.add_parser("store", help="SQLite policy store: bulk-load results, export JSON layouts, query")
+    p.add_argument("action", choices=["load", "export", "query"])
+    p.add_argument("paths", nargs="*", help="files to load (default: data, enhanced and cleaned results)")
+    p.add_argument("--db", default="results/policies.sqlite")
+    p.add_argument("--layout", choices=["raw", "grouped", "enhanced"], default="enhanced")
+    p.add_argument("--dataset", help="results dataset, e.g. enhanced_data or cleaned_data")
+    p.add_argument("--output", help="publish the export here instead of printing it")
+    p.add_argument("--account")
+    p.add_argument("--state")
+    p.add_argument("--lob")
+    p.add_argument("--min-score", type=float)
+    p.add_argument("--limit", type=int, default=20)
+    p.set_defaults(func=cmd_store)
+
+    p = sub.add_parser("trends", help="daily/weekly and trailing-window trends by state and LOB (incremental)")
+    p.add_argument("--input", default=DATA)
+    p.add_argument("--output", default="results/trends.json")
+    p.add_argument("--prune", action="store_true", help="input is the full book: drop policies missing from it")
+    p.set_defaults(func=cmd_trends)
+
+    p = sub.add_parser("quantiles", help="p50/p90/p99 score sketches per state, LOB and account")
+    p.add_argument("--input", default=ENHANCED, help="results file to sketch")
+    p.add_argument("--k", type=int, default=200, help="sketch size (rank error about 1.7/k)")
+    p.add_argument("--merge", nargs="+", metavar="SKETCH", help="merge these .quantiles.json shard files instead")
+    p.add_argument("--output", default="results/merged.quantiles.json")
+    p.add_argument("--dimension", choices=["state", "line_of_business", "account"], default="state")
+    p.set_defaults(func=cmd_quantiles)
+
+    p = sub.add_parser("snapshots", help="show the published versions of a results file")
+    p.add_argument("path", nargs="?", default=ENHANCED)
+    p.set_defaults(func=cmd_snapshots)
+
+    p = sub.add_parser("guidelines", help="score against several guideline sets at once")
+    p.add_argument("--input", default=DATA)
+    p.add_argument("--sets", help="JSON file of {name: guideline text}")
+    p.add_argument("--output", default="results/guideline_fit.json")
+    p.set_defaults(func=cmd_guidelines)
+
+    p = sub.add_parser("watch", help="rescore on input changes and write deltas")
+    p.add_argument("--input", default=DATA)
+    p.add_argument("--output", default=ENHANCED)
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser("serve", help="low-latency scoring HTTP service")
+    p.add_argument("--accounts", default=CLEANED)
+    p.add_argument("--port", type=int, default=8080)
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("dynamo-load", help="bulk-load a results file into main-table")
+    p.add_argument("--input", default=CLEANED)
+    p.add_argument("--endpoint-url", help="e.g. http://localhost:8000 for DynamoDB Local")
+    p.set_defaults(func=cmd_dynamo_load)
+
+    p = sub.add_parser("dynamo-scan", help="segmented scan of main-table into the scorers")
+    p.add_argument("--endpoint-url")
+    p.add_argument("--segments", type=int, default=4)
+    p.set_defaults(func=cmd_dynamo_scan)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    start = time.perf_counter()
+    try:
+        args.func(args)
+    finally:
+        if args.timing:
+            loaded = [m for m in HEAVY_MODULES if m in sys.modules]
+            print(f"[timing] {args.command}: imports {_import_seconds:.3f}s, "
+                  f"total {time.perf_counter() - start:.3f}s, "
+                  f"heavy modules loaded: {', '.join(loaded) or 'none'}", file=sys.stderr)
@@ -1,259 +1,210 @@
-import cohere, yaml, json
-from collections import defaultdict
-import math
+import json
+
+from .account_resolution import annotate
+from .accounts import aggregate_accounts
+from .cascade import cascade_rerank
+from .cohere_client import get_client
+from .explanations import annotate as annotate_explanations
+from .guidelines import GUIDELINES
+from .justification_cache import DEFAULT_CAP, DEFAULT_FEATURES, TEMPLATE_HINT, JustificationCache, fill
+from .policy_docs import policy_yaml
+from .policy_index import build_index
+from .prompts import DEFAULT_CEILING, PromptBuilder
+from .quantiles import build_sketches
+from .rerank import rerank_with_fallback
+from .risk_score import WEIGHT_PROFILES, calculate_risk_score
+from .snapshots import DEFAULT_KEEP, publish
 
-co = cohere.ClientV2("AL4ANky2zDeuC29JhuMCrgfdxj175R1nBA9MzqEK")
-
-guidelines = """
-Carrier appetite:
-- Commercial Property
-- TIV > $10M
-- Loss ratio < 0.7
-- Construction: Fire Resistive or Non-Combustible preferred
-- Built after 1950
-- States: CA or TX prioritized
-"""
 
 # ---------------------------
-# Step 1: Load data
+# Step 2 + 3: Prepare YAML docs, Cohere rerank (policy-level)
+# (falls back to the offline lexical ranker if the rerank API fails)
 # ---------------------------
-with open("results/data.json", "r") as f:
-    data = json.load(f)
-
-policies = data["output"][0]["data"]
-
-# ---------------------------
-# Step 2: Prepare YAML docs
-# ---------------------------
-yaml_docs = []
-for p in policies:
-    doc = {
-        "PolicyID": p["id"],
-        "LineOfBusiness": p.get("line_of_business"),
-        "State": p.get("primary_risk_state"),
-        "TIV": p.get("tiv"),
-        "Premium": p.get("total_premium"),
-        "LossValue": p.get("loss_value"),
-        "Construction": p.get("construction_type"),
-        "BuildingYear": p.get("oldest_building"),
-        "Winnability": p.get("winnability"),
-    }
-    yaml_docs.append(yaml.dump(doc, sort_keys=False))
-
-# ---------------------------
-# Step 3: Cohere rerank (policy-level)
-# ---------------------------
-results = co.rerank(
-    model="rerank-v3.5",
-    query=guidelines,
-    documents=yaml_docs,
-    top_n=len(yaml_docs)
-)
-
-for r in results.results:
-    policies[r.index]["cohere_relevance"] = r.relevance_score
-
-ranked_policies = sorted(policies, key=lambda x: x["cohere_relevance"], reverse=True)
-
-# ---------------------------
-# Risk Score Calculation
-# ---------------------------
-def calculate_risk_score(policy):
-    premium = policy.get("total_premium", 0) or 1
-    loss_value = policy.get("loss_value", 0) or 0
-    tiv = policy.get("tiv", 0) or 0
-    year = policy.get("oldest_building", 2025) or 2025
-    construction = (policy.get("construction_type") or "").lower()
-    state = policy.get("primary_risk_state", "")
-    winnability = policy.get("winnability", 0.5) or 0.5
-
-    premium = float(policy.get("total_premium", 0) or 0)
-    loss_value = float(policy.get("loss_value", 0) or 0)
-
-    # Loss ratio normalization
-    loss_ratio = loss_value / premium if premium > 0 else 1
-    loss_ratio_norm = min(1, loss_ratio / 0.7)
-    loss_component = 1 - loss_ratio_norm
-
-    # TIV normalization (log scale up to 50M)
-    tiv_norm = min(1, math.log(max(tiv, 1)) / math.log(50_000_000))
-
-    # Construction score
-    if "fire resistive" in construction or "non-combustible" in construction:
-        construction_score = 1
-    elif "masonry" in construction or "mixed" in construction:
-        construction_score = 0.5
-    elif construction:
-        construction_score = 0.2
-    else:
-        construction_score = 0.3  # unknown
-
-    # Age score
-    age_score = max(0, 1 - (2025 - int(year)) / 100)
-
-    # State score
-    if state in ["CA", "TX"]:
-        state_score = 1
-    else:
-        state_score = 0.5
-
-    # Winnability (normalize if percentage)
-    if isinstance(winnability, (int, float)):
-        if winnability > 1:
-            winnability = min(1, winnability / 100)
-    else:
-        winnability = 0.5
-
-    # Weighted risk score
-    risk_score = (
-        0.35 * loss_component +
-        0.25 * tiv_norm +
-        0.15 * construction_score +
-        0.10 * age_score +
-        0.10 * state_score +
-        0.05 * winnability
-    )
-
-    return round(risk_score * 100, 2)  # scale to 0–100
+def rank_policies(co, policies, guidelines=GUIDELINES, cascade=False, cascade_top_m=50, cascade_threshold=0.0,
+                  rerank_fn=None):
+    """
+    Set cohere_relevance / relevance_engine on every policy and return them ranked.
+    rerank_fn(query, documents) -> (scores, engine) replaces the direct rerank
+    (e.g. a shared RerankGateway's rerank).
+
+    Cascade mode scores locally first and only sends the top cascade_top_m
+    policies (with local score >= cascade_threshold) to rerank. The rest keep
+    their local score, are flagged with relevance_engine = "local" and rank
+    after every reranked policy.
+    """
+    if rerank_fn is None:
+        def rerank_fn(query, documents):
+            return rerank_with_fallback(co, query, documents)
+
+    if cascade:
+        return cascade_rerank(
+            policies, guidelines, rerank_fn,
+            top_m=cascade_top_m, threshold=cascade_threshold
+        )
+
+    yaml_docs = [policy_yaml(p) for p in policies]
+    scores, engine = rerank_fn(guidelines, yaml_docs)
+    for p, score in zip(policies, scores):
+        p["cohere_relevance"] = score
+        p["relevance_engine"] = engine
+
+    return sorted(policies, key=lambda x: x["cohere_relevance"], reverse=True)
 
 
 # ---------------------------
 # Step 4: Generate justification points + references
 # ---------------------------
-for p in ranked_policies:
-    # Justifications
-    explanation_prompt = f"""
-Guidelines:
-{guidelines}
+# Reply field per chat task, and what a non-JSON reply becomes
+FIELDS = {"points": "justification_points", "references": "references"}
+FALLBACKS = {
+    "points": lambda txt: {"points": [txt]},
+    "references": lambda txt: {"references": [{"point": txt, "link": "https://example.com"}]},
+}
 
-Policy:
-{yaml.dump({
-    "PolicyID": p["id"],
-    "LineOfBusiness": p.get("line_of_business"),
-    "State": p.get("primary_risk_state"),
-    "TIV": p.get("tiv"),
-    "Premium": p.get("total_premium"),
-    "LossValue": p.get("loss_value"),
-    "Construction": p.get("construction_type"),
-    "BuildingYear": p.get("oldest_building"),
-    "Winnability": p.get("winnability"),
-}, sort_keys=False)}
 
-Return a JSON object with key "points" containing an array of short bullet points explaining alignment with guidelines.
-"""
-    resp = co.chat(
-        model="command-r-plus",
-        messages=[
-            {"role": "system", "content": "You are an underwriting assistant."},
-            {"role": "user", "content": explanation_prompt}
-        ],
-        temperature=0.2
+def _streamed(co, p, task, prompts, on_item):
+    """
+    One task over a streamed reply. Items reach on_item(p, field, item) as they
+    complete; if the stream breaks, the completed items are kept. A stream that
+    fails before its first item falls back to one regular (retried) call.
+    """
+    field = FIELDS[task]
+    emit = (lambda item: on_item(p, field, item)) if on_item else None
+    items, text, error = prompts.chat_stream(co, task, p, on_item=emit)
+    if error is not None and items:
+        p.setdefault("explanation_partial", []).append(field)
+        return items
+    if error is None:
+        return items or FALLBACKS[task](text)[task]
+    items = prompts.chat_json(co, task, p, FALLBACKS[task])[task]
+    for item in items if emit else ():
+        emit(item)
+    return items
+
+
+def explain_policy(co, p, guidelines=GUIDELINES, template_hint="", prompts=None, stream=True, on_item=None):
+    """
+    Set justification_points and references on one policy (two chat calls).
+    prompts is the run's PromptBuilder; template_hint goes into its preamble
+    (see justification_cache) when a builder is made here. With stream=True
+    replies are parsed as they arrive and each point / reference is passed to
+    on_item(policy, field, item) once complete.
+    """
+    if prompts is None:
+        prompts = PromptBuilder(guidelines, template_hint)
+
+    for task, field in FIELDS.items():
+        if stream:
+            p[field] = _streamed(co, p, task, prompts, on_item)
+        else:
+            p[field] = prompts.chat_json(co, task, p, FALLBACKS[task])[task]
+
+
+def run(input_path="results/data.json", output_path="results/enhanced_data.json",
+        guidelines=GUIDELINES, top=None, profile="default",
+        cascade=False, cascade_top_m=50, cascade_threshold=0.0, resolve=False,
+        reuse=False, reuse_features=DEFAULT_FEATURES, reuse_cap=DEFAULT_CAP, narrate=True,
+        token_ceiling=DEFAULT_CEILING, stream=True, on_item=None, keep=DEFAULT_KEEP,
+        policies=None, co=None, rerank_fn=None):
+    """
+    Full pipeline: rerank, explain, aggregate by account, save enhanced JSON.
+    top keeps only the top N ranked policies; profile picks the risk weights
+    from WEIGHT_PROFILES. resolve merges spelling variants of an account name
+    (see account_resolution) and keys accounts by canonical account id.
+    reuse generates justifications once per feature bucket of up to
+    reuse_cap policies and fills in per-policy numbers (see justification_cache).
+
+    Every policy first gets a score_breakdown and template justification
+    points (explanations.annotate, no API calls); narrate=True upgrades the
+    ranked ones with LLM justifications and references. Chat prompts share
+    one system preamble and stay under token_ceiling estimated input tokens
+    each (see prompts). With stream=True each point / reference is handed to
+    on_item(policy, field, item) as soon as it has streamed in.
+
+    The output is published as a new snapshot version (see snapshots); the
+    last `keep` versions are retained.
+
+    policies (already parsed input), co (client) and rerank_fn (a shared
+    RerankGateway's rerank) let batch runners share parsed data, response
+    caches and coalesced rerank calls across runs (see job_queue).
+    """
+    co = co or get_client()
+    weights = WEIGHT_PROFILES[profile]
+
+    # ---------------------------
+    # Step 1: Load data
+    # ---------------------------
+    if policies is None:
+        with open(input_path, "r") as f:
+            data = json.load(f)
+
+        policies = data["output"][0]["data"]
+
+    ranked_policies = rank_policies(
+        co, policies, guidelines,
+        cascade=cascade, cascade_top_m=cascade_top_m, cascade_threshold=cascade_threshold,
+        rerank_fn=rerank_fn,
     )
-    txt = resp.message.content[0].text.strip()
-    try:
-        jus = json.loads(txt)
-    except:
-        jus = {"points": [txt]}
-    p["justification_points"] = jus["points"]
-
-    # References
-    reference_prompt = f"""
-You are an underwriting assistant.
-Given the following guidelines and policy details, generate 2-3 short reference-style objects
-to support underwriting trust. Each object must have:
-- "point": short explanation
-- "link": a plausible reference URL (industry report, gov site, or insurance article)
-
-Guidelines:
-{guidelines}
-
-Policy:
-{yaml.dump({
-    "PolicyID": p["id"],
-    "LineOfBusiness": p.get("line_of_business"),
-    "State": p.get("primary_risk_state"),
-    "TIV": p.get("tiv"),
-    "Premium": p.get("total_premium"),
-    "LossValue": p.get("loss_value"),
-    "Construction": p.get("construction_type"),
-    "BuildingYear": p.get("oldest_building"),
-    "Winnability": p.get("winnability"),
-}, sort_keys=False)}
-
-Return a JSON object with key "references" containing an array of objects with keys "point" and "link".
-"""
-    resp_refs = co.chat(
-        model="command-r-plus",
-        messages=[
-            {"role": "system", "content": "You provide concise external-style references with links to support underwriting judgment."},
-            {"role": "user", "content": reference_prompt}
-        ],
-        temperature=0.2
+    if top is not None:
+        ranked_policies = ranked_policies[:top]
+
+    annotate_explanations(policies, weights)
+
+    cache = JustificationCache(reuse_features, reuse_cap) if reuse else None
+    prompts = PromptBuilder(guidelines, TEMPLATE_HINT if reuse else "", ceiling=token_ceiling)
+    for idx, p in enumerate(ranked_policies if narrate else [], start=1):
+        # Pruned by the cascade: no chat calls
+        if p.get("relevance_engine") == "local":
+            continue
+        if cache:
+            # Streamed items are bucket templates: fill them for the policy being generated
+            emit = (lambda q, field, item: on_item(q, field, fill(item, q))) if on_item else None
+            cache.explain(p, lambda q: explain_policy(co, q, prompts=prompts, stream=stream, on_item=emit))
+            if on_item and p["justification_cache"]["reused"]:
+                for field in FIELDS.values():
+                    for item in p[field]:
+                        on_item(p, field, item)
+        else:
+            explain_policy(co, p, prompts=prompts, stream=stream, on_item=on_item)
+        p["explanation_engine"] = "llm"
+        print(f"Processed policy {idx} of {len(ranked_policies)}")
+    if cache:
+        stats = cache.stats()
+        print(f"Justification reuse: {stats['generations']} generations for {stats['policies']} policies "
+              f"({stats['reused']} reused, {stats['buckets']} buckets, {stats['rejected']} not cached: literal figures)")
+    if prompts.calls:
+        print(prompts.report())
+
+    # ---------------------------
+    # Step 5: Aggregate by account
+    # ---------------------------
+    resolved = annotate(policies) if resolve else None
+    account_data = aggregate_accounts(
+        ranked_policies,
+        risk_fn=lambda p: calculate_risk_score(p, weights),
+        key="account_id" if resolve else "account_name"
     )
-    txt_refs = resp_refs.message.content[0].text.strip()
-    try:
-        refs = json.loads(txt_refs)
-    except:
-        refs = {"references": [{"point": txt_refs, "link": "https://example.com"}]}
-    p["references"] = refs["references"]
-
-# ---------------------------
-# Step 5: Aggregate by account
-# ---------------------------
-accounts = defaultdict(list)
-for p in ranked_policies:
-    accounts[p["account_name"]].append(p)
-
-account_data = {}
-for acc, plist in accounts.items():
-    scores = [p["cohere_relevance"] for p in plist]
-    premiums = [p.get("total_premium", 1) for p in plist]
-    avg = sum(scores) / len(scores)
-    mx = max(scores)
-    wavg = sum(s * pr for s, pr in zip(scores, premiums)) / sum(premiums)
-
-    # Compute policy-level scores + risk scores
-    policies_obj = {}
-    policy_risk_scores = []
-    weighted_risk_sum = 0
-    total_premium = sum(premiums)
-
-    for p in plist:
-        indiv_score = (p["cohere_relevance"] + wavg) / 2
-        risk_score = calculate_risk_score(p)
-        policy_risk_scores.append(risk_score)
-        weighted_risk_sum += risk_score * (p.get("total_premium", 1) or 1)
-
-        policies_obj[p["id"]] = {
-            **p,
-            "cohere_relevance": p["cohere_relevance"],
-            "score": round(indiv_score, 3),
-            "risk_score": risk_score,
-            "justification_points": p.get("justification_points", []),
-            "references": p.get("references", [])
-        }
+    if resolved:
+        for acc_id, entry in account_data.items():
+            entry.update(resolved[acc_id])
+
+    # ---------------------------
+    # Step 6: Save to enhanced JSON
+    # ---------------------------
+    output = {
+        "accounts": account_data
+    }
 
-    # Account-level aggregated risk scores
-    avg_risk_score = sum(policy_risk_scores) / len(policy_risk_scores)
-    weighted_risk_score = weighted_risk_sum / total_premium if total_premium > 0 else avg_risk_score
+    version = publish(output_path, output, keep=keep, indent=4)
 
-    account_data[acc] = {
-        "avg_score": round(avg, 3),
-        "max_score": round(mx, 3),
-        "weighted_score": round(wavg, 3),
-        "avg_risk_score": round(avg_risk_score, 2),
-        "weighted_risk_score": round(weighted_risk_score, 2),
-        "policies": policies_obj
-    }
+    print(f"Saved {output_path} (v{version}) successfully with account + policy structure and risk scores.")
 
-# ---------------------------
-# Step 6: Save to enhanced JSON
-# ---------------------------
-output = {
-    "accounts": account_data
-}
+    # Range/date indexes for the dashboard, next to the results
+    build_index(ranked_policies, output_path, version, keep=keep)
+    # Mergeable p50/p90/p99 sketches per state / LOB / account, also next to the results
+    build_sketches((p for acc in account_data.values() for p in acc["policies"].values()), output_path)
+    return output
 
-with open("results/enhanced_data.json", "w") as f:
-    json.dump(output, f, indent=4)
 
-print("Saved enhanced_data.json successfully with account + policy structure and risk scores.")
+if __name__ == "__main__":
+    run()
@@ -1,59 +1,248 @@
-import cohere, yaml
-
-co = cohere.ClientV2("AL4ANky2zDeuC29JhuMCrgfdxj175R1nBA9MzqEK")
-
-# Appetite guidelines = query
-guidelines = """
-Carrier appetite:
-- Commercial Property
-- TIV > $10M
-- Loss ratio < 0.7
-- Construction: Fire Resistive or Non-Combustible preferred
-- Built after 1950
-- States: CA or TX prioritized
-"""
-
-import json
-
-with open("model/data.json", "r") as f:
-    data = json.load(f)
-
-
-# Get policies
-policies = data["output"][0]["data"]
-
-# Convert policies into YAML for better structured matching
-yaml_docs = []
-for p in policies:
-    doc = {
-        "PolicyID": p["id"],
-        "LineOfBusiness": p.get("line_of_business"),
-        "State": p.get("primary_risk_state"),
-        "TIV": p.get("tiv"),
-        "Premium": p.get("total_premium"),
-        "LossValue": p.get("loss_value"),
-        "Construction": p.get("construction_type"),
-        "BuildingYear": p.get("oldest_building"),
-        "Winnability": p.get("winnability"),
-    }
-    yaml_docs.append(yaml.dump(doc, sort_keys=False))
-
-# Call Cohere rerank
-results = co.rerank(
-    model="rerank-v3.5",   # multilingual, best accuracy
-    query=guidelines,
-    documents=yaml_docs,
-    top_n=10
-)
-
-# Attach scores back to policies
-for r in results.results:
-    idx = r.index
-    policies[idx]["cohere_relevance"] = r.relevance_score
-
-# Sort policies by Cohere relevance
-ranked = sorted(policies, key=lambda x: x.get("cohere_relevance", 0), reverse=True)
-
-print("Top 5 Policies (by Cohere Rerank):")
-for p in ranked[:5]:
-    print(f"ID {p['id']} | Score {p['cohere_relevance']:.3f} | {p['account_name']}")
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling Cohere while the circuit breaker is open."""
+
+
+class AIMDLimiter:
+    """
+    Concurrency limit with additive increase / multiplicative decrease:
+    every success grows the limit by about one slot per full window,
+    every 429 halves it.
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=32):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, throttled=False):
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit / 2)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls for
+    reset_after seconds; then lets a single trial call through (half-open).
+    """
+
+    def __init__(self, failure_threshold=5, reset_after=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_after and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record(self, ok):
+        with self._lock:
+            self._trial_running = False
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+            else:
+                self.failures += 1
+                if self.failures >= self.failure_threshold:
+                    self.opened_at = time.monotonic()
+
+
+def _status(e):
+    return getattr(e, "status_code", None)
+
+
+def _retryable(e):
+    if _status(e) in RETRYABLE_STATUS:
+        return True
+    # httpx timeouts / connection errors
+    return e.__class__.__name__.endswith(("Timeout", "TimeoutException", "ConnectError")) or isinstance(e, TimeoutError)
+
+
+class SharedCohereClient:
+    """
+    Drop-in for cohere.ClientV2 (co.rerank / co.chat / co.chat_stream) shared by every script.
+
+    - api key from COHERE_API_KEY unless passed in (no key: RuntimeError)
+    - one pooled keep-alive HTTP client
+    - per-call timeout (timeout seconds) and retries with jittered backoff
+    - AIMD concurrency limit that halves on 429s and grows on success
+    - circuit breaker that fails fast (CircuitOpenError) while Cohere is down
+    - optional hedging: if a call has not returned after hedge_after seconds,
+      a duplicate is sent and whichever finishes first wins
+    """
+
+    def __init__(self, api_key=None, timeout=30, max_retries=3, hedge_after=None,
+                 max_connections=32, limiter=None, breaker=None, client=None):
+        if client is None:
+            api_key = api_key or os.environ.get("COHERE_API_KEY")
+            if not api_key:
+                raise RuntimeError("COHERE_API_KEY environment variable is not set")
+            import cohere
+            import httpx
+
+            client = cohere.ClientV2(
+                api_key,
+                httpx_client=httpx.Client(
+                    timeout=timeout,
+                    limits=httpx.Limits(max_connections=max_connections,
+                                        max_keepalive_connections=max_connections),
+                ),
+            )
+        self.client = client
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.hedge_after = hedge_after
+        self.limiter = limiter or AIMDLimiter(maximum=max_connections)
+        self.breaker = breaker or CircuitBreaker()
+        self._hedge_pool = ThreadPoolExecutor(max_workers=max_connections) if hedge_after else None
+
+    def rerank(self, **kwargs):
+        return self._call("rerank", kwargs)
+
+    def chat(self, **kwargs):
+        return self._call("chat", kwargs)
+
+    def chat_stream(self, **kwargs):
+        # Streams are consumed by the caller, so only the breaker applies
+        if not self.breaker.allow():
+            raise CircuitOpenError("Cohere circuit breaker is open")
+        try:
+            stream = self.client.chat_stream(**self._with_timeout(kwargs))
+        except Exception as e:
+            self.breaker.record(ok=not _retryable(e))
+            raise
+        return self._recorded(stream)
+
+    def _recorded(self, stream):
+        """Yield the stream's events, then record its outcome (releasing a half-open trial)."""
+        ok = False
+        try:
+            yield from stream
+            ok = True
+        except GeneratorExit:
+            ok = True  # the caller stopped reading; Cohere itself was fine
+            raise
+        except Exception as e:
+            ok = not _retryable(e)
+            raise
+        finally:
+            self.breaker.record(ok=ok)
+
+    def _with_timeout(self, kwargs):
+        options = dict(kwargs.get("request_options") or {})
+        options.setdefault("timeout_in_seconds", int(self.timeout))
+        options["max_retries"] = 0  # retries are handled here
+        return {**kwargs, "request_options": options}
+
+    def _attempt(self, method, kwargs):
+        self.limiter.acquire()
+        throttled = False
+        try:
+            return getattr(self.client, method)(**kwargs)
+        except Exception as e:
+            throttled = _status(e) == 429
+            raise
+        finally:
+            self.limiter.release(throttled=throttled)
+
+    def _hedged(self, method, kwargs):
+        if not self._hedge_pool:
+            return self._attempt(method, kwargs)
+        first = self._hedge_pool.submit(self._attempt, method, kwargs)
+        done, _ = wait([first], timeout=self.hedge_after)
+        if done:
+            return first.result()
+        second = self._hedge_pool.submit(self._attempt, method, kwargs)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                if f.exception() is None:
+                    return f.result()
+                error = f.exception()
+        raise error
+
+    def _call(self, method, kwargs):
+        kwargs = self._with_timeout(kwargs)
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError("Cohere circuit breaker is open")
+            try:
+                result = self._hedged(method, kwargs)
+            except Exception as e:
+                if not _retryable(e):
+                    self.breaker.record(ok=True)  # Cohere answered; the request itself was bad
+                    raise
+                self.breaker.record(ok=False)
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(min(8.0, 0.25 * 2 ** attempt) * (0.5 + random.random()))
+            else:
+                self.breaker.record(ok=True)
+                return result
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_client(**kwargs):
+    """Process-wide SharedCohereClient (created on first use)."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = SharedCohereClient(**kwargs)
+        return _shared
+
+
+if __name__ == "__main__":
+    co = get_client()
+
+    query = "What is the capital of the United States?"
+    docs = [
+        "Carson City is the capital city of the American state of Nevada. At the 2010 United States Census, Carson City had a population of 55,274.",
+        "The Commonwealth of the Northern Mariana Islands is a group of islands in the Pacific Ocean that are a political division controlled by the United States. Its capital is Saipan.",
+        "Charlotte Amalie is the capital and largest city of the United States Virgin Islands. It has about 20,000 people. The city is on the island of Saint Thomas.",
+        "Washington, D.C. (also known as simply Washington or D.C., and officially as the District of Columbia) is the capital of the United States. It is a federal district. The President of the USA and many major national government offices are in the territory. This makes it the political center of the United States of America.",
+        "Capital punishment has existed in the United States since before the United States was a country. As of 2017, capital punishment is legal in 30 of the 50 states. The federal government (including the United States military) also uses capital punishment.",
+    ]
+
+    results = co.rerank(
+        model="rerank-v3.5", query=query, documents=docs, top_n=5
+    )
+
+    print("Rerank results:")
+    for r in results.results:
+        print(f"Document {r.index} | Relevance Score: {r.relevance_score:.3f}")
+        print(docs[r.index])
+        print()
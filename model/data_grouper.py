@@ -1,28 +1,237 @@
+import heapq
+import itertools
 import json
+import os
+import re
+import shutil
+import tempfile
 from collections import defaultdict
 
-# Load data
-with open("test_results/test_data.json", "r") as f:
-    data = json.load(f)
+MAX_RECORDS_IN_MEMORY = 50_000  # records buffered before a sorted run is spilled to disk
+MERGE_FAN_IN = 64  # run files merged at once (bounds open file handles)
+CHUNK_SIZE = 1 << 16
 
-# Extract policies
-policies = data["output"][0]["data"]
+_DATA_ARRAY = re.compile(r'"data"\s*:\s*\[')
 
-# Group by account_name
-grouped = defaultdict(list)
-for policy in policies:
-    grouped[policy["account_name"]].append(policy)
 
-# Convert back to JSON structure
-grouped_data = {"grouped_accounts": []}
-for account, records in grouped.items():
-    grouped_data["grouped_accounts"].append({
-        "account_name": account,
-        "records": records
-    })
+def group_policies(policies):
+    """Group policies by account_name into the grouped_policies.json layout (in memory)."""
+    grouped = defaultdict(list)
+    for policy in policies:
+        grouped[policy["account_name"]].append(policy)
 
-# Save to file
-with open("test_results/test_grouped_policies.json", "w") as f:
-    json.dump(grouped_data, f, indent=4)
+    # Convert back to JSON structure
+    grouped_data = {"grouped_accounts": []}
+    for account, records in grouped.items():
+        grouped_data["grouped_accounts"].append({
+            "account_name": account,
+            "records": records
+        })
+    return grouped_data
 
-print("Grouped data saved to test_results/test_grouped_policies.json")
+
+# ---------------------------
+# Streaming input
+# ---------------------------
+def iter_policies(path, chunk_size=CHUNK_SIZE):
+    """
+    Yield the policies of an export one at a time without loading the file.
+    Reads the {"output": [{"data": [...]}]} layout chunk by chunk, or one
+    policy per line for .ndjson files.
+    """
+    if path.endswith(".ndjson"):
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+
+    decoder = json.JSONDecoder()
+    with open(path, "r") as f:
+        buf = ""
+        match = None
+        while match is None:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                raise ValueError(f"{path}: no \"data\" array found")
+            buf += chunk
+            match = _DATA_ARRAY.search(buf)
+        pos = match.end()
+        eof = False
+
+        while True:
+            # Skip separators between records
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            if pos < len(buf):
+                try:
+                    policy, end = decoder.raw_decode(buf, pos)
+                    yield policy
+                    pos = end
+                    continue
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+            elif eof:
+                raise ValueError(f"{path}: unterminated \"data\" array")
+
+            # Record spans the chunk boundary: drop what's consumed, read more
+            buf = buf[pos:]
+            pos = 0
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf += chunk
+
+
+# ---------------------------
+# Sorted runs + k-way merge
+# ---------------------------
+def _spill(buffer, tmp_dir):
+    """Sort buffered (order, seq, policy) rows and write them as one NDJSON run."""
+    buffer.sort(key=lambda row: (row[0], row[1]))
+    fd, path = tempfile.mkstemp(suffix=".run", dir=tmp_dir)
+    with os.fdopen(fd, "w") as f:
+        for row in buffer:
+            f.write(json.dumps(row))
+            f.write("\n")
+    return path
+
+
+def _read_run(path):
+    with open(path, "r") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _merged(runs):
+    return heapq.merge(*(_read_run(r) for r in runs), key=lambda row: (row[0], row[1]))
+
+
+def _merge_runs(runs, tmp_dir, fan_in=MERGE_FAN_IN):
+    """Merge runs in passes until at most fan_in remain."""
+    while len(runs) > fan_in:
+        batch, runs = runs[:fan_in], runs[fan_in:]
+        fd, path = tempfile.mkstemp(suffix=".run", dir=tmp_dir)
+        with os.fdopen(fd, "w") as f:
+            for row in _merged(batch):
+                f.write(json.dumps(row))
+                f.write("\n")
+        for r in batch:
+            os.remove(r)
+        runs.append(path)
+    return runs
+
+
+def iter_groups(policies, max_records=MAX_RECORDS_IN_MEMORY, tmp_dir=None, key="account_name"):
+    """
+    Yield (account key, records iterator) in first-seen account order, with
+    records in input order, holding at most max_records policies in memory.
+
+    Policies are buffered and spilled as sorted runs once the buffer fills;
+    the runs are then k-way merged. Only the account -> first-seen index map
+    stays resident. Each records iterator must be consumed before the next
+    group is requested.
+    """
+    order = {}
+    buffer = []
+    runs = []
+    work_dir = tempfile.mkdtemp(prefix="grouper-", dir=tmp_dir)
+    try:
+        for seq, policy in enumerate(policies):
+            account = policy[key]
+            idx = order.setdefault(account, len(order))
+            buffer.append((idx, seq, policy))
+            if len(buffer) >= max_records:
+                runs.append(_spill(buffer, work_dir))
+                buffer = []
+
+        names = list(order)
+        del order
+
+        if runs:
+            if buffer:
+                runs.append(_spill(buffer, work_dir))
+                buffer = []
+            rows = _merged(_merge_runs(runs, work_dir))
+        else:
+            # Everything fit in memory: no disk round-trip
+            buffer.sort(key=lambda row: (row[0], row[1]))
+            rows = iter(buffer)
+
+        for idx, group in itertools.groupby(rows, key=lambda row: row[0]):
+            yield names[idx], (row[2] for row in group)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# ---------------------------
+# Incremental output
+# ---------------------------
+def _indented(obj, level):
+    """json.dumps(obj, indent=4) nested `level` indents deep."""
+    return json.dumps(obj, indent=4).replace("\n", "\n" + " " * (4 * level))
+
+
+def write_grouped(groups, f):
+    """
+    Write (account_name, records) groups to f in the grouped_policies.json
+    layout, one record at a time. The bytes match json.dump(..., indent=4)
+    of group_policies(). Returns (accounts, records) written.
+    """
+    accounts = records_written = 0
+    f.write('{\n    "grouped_accounts": [')
+    for account, records in groups:
+        f.write(",\n" if accounts else "\n")
+        f.write(f'        {{\n            "account_name": {json.dumps(account)},\n            "records": [')
+        n = 0
+        for record in records:
+            f.write(",\n" if n else "\n")
+            f.write(" " * 16 + _indented(record, 4))
+            n += 1
+        f.write("\n            ]\n        }" if n else "]\n        }")
+        accounts += 1
+        records_written += n
+    f.write("\n    ]\n}" if accounts else "]\n}")
+    return accounts, records_written
+
+
+def _resolved(policies, mapping):
+    from .account_resolution import lookup
+
+    for p in policies:
+        p["account_id"] = lookup(mapping, p.get("account_name"))
+        yield p
+
+
+def group_file(input_path, output_path, max_records=MAX_RECORDS_IN_MEMORY, tmp_dir=None, resolve=False):
+    """
+    Stream input_path, group by account with bounded memory, write output_path.
+    resolve groups spelling variants together under their canonical name
+    (account_resolution); that costs one extra streaming pass to collect names.
+    """
+    policies = iter_policies(input_path)
+    key = "account_name"
+    if resolve:
+        from .account_resolution import resolve_accounts
+
+        mapping, accounts = resolve_accounts(p.get("account_name") for p in iter_policies(input_path))
+        policies = _resolved(policies, mapping)
+        key = "account_id"
+
+    groups = iter_groups(policies, max_records=max_records, tmp_dir=tmp_dir, key=key)
+    if resolve:
+        groups = ((accounts[acc_id]["account_name"], records) for acc_id, records in groups)
+    with open(output_path, "w") as f:
+        return write_grouped(groups, f)
+
+
+def main(input_path="test_results/test_data.json", output_path="test_results/test_grouped_policies.json",
+         max_records=MAX_RECORDS_IN_MEMORY, resolve=False):
+    accounts, records = group_file(input_path, output_path, max_records=max_records, resolve=resolve)
+    print(f"Grouped {records} policies into {accounts} accounts, saved to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
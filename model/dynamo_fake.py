@@ -0,0 +1,58 @@
+import random
+import threading
+
+
+class FakeDynamoClient:
+    """
+    In-process stand-in for a boto3 DynamoDB client, for running the
+    DynamoDB sink/source without AWS or DynamoDB Local.
+
+    Items are kept in the low-level attribute-value format boto3 uses
+    ({"id": {"N": "956"}, ...}), keyed by their hash key "id".
+    unprocessed_rate makes batch_write_item hand back that fraction of
+    requests as UnprocessedItems, like a throttled table would.
+    """
+
+    def __init__(self, tables=("main-table", "guidelines-table"), unprocessed_rate=0.0, seed=0):
+        self.tables = {name: {} for name in tables}
+        self.unprocessed_rate = unprocessed_rate
+        self.calls = {"batch_write_item": 0, "scan": 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def batch_write_item(self, RequestItems):
+        if sum(len(reqs) for reqs in RequestItems.values()) > 25:
+            raise ValueError("Too many items requested for the BatchWriteItem call")
+
+        unprocessed = {}
+        with self._lock:
+            self.calls["batch_write_item"] += 1
+            for table_name, reqs in RequestItems.items():
+                table = self.tables[table_name]
+                for req in reqs:
+                    if self._rng.random() < self.unprocessed_rate:
+                        unprocessed.setdefault(table_name, []).append(req)
+                    elif "PutRequest" in req:
+                        item = req["PutRequest"]["Item"]
+                        table[item["id"]["N"]] = item
+                    else:
+                        table.pop(req["DeleteRequest"]["Key"]["id"]["N"], None)
+
+        return {"UnprocessedItems": unprocessed}
+
+    def scan(self, TableName, Segment=0, TotalSegments=1, Limit=100, ExclusiveStartKey=None):
+        with self._lock:
+            self.calls["scan"] += 1
+            keys = sorted(
+                (k for k in self.tables[TableName] if int(float(k)) % TotalSegments == Segment),
+                key=float,
+            )
+            if ExclusiveStartKey is not None:
+                start = float(ExclusiveStartKey["id"]["N"])
+                keys = [k for k in keys if float(k) > start]
+            page = [self.tables[TableName][k] for k in keys[:Limit]]
+
+        resp = {"Items": page, "Count": len(page)}
+        if len(keys) > Limit:
+            resp["LastEvaluatedKey"] = {"id": page[-1]["id"]}
+        return resp
@@ -0,0 +1,96 @@
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from boto3.dynamodb.types import TypeSerializer
+
+TABLE_NAME = "main-table"  # created by aws-cli-create-tables.sh (hash key "id", N)
+BATCH_SIZE = 25  # BatchWriteItem limit
+
+_serializer = TypeSerializer()
+
+
+def make_client(endpoint_url=None, region_name="us-east-1"):
+    """boto3 DynamoDB client; pass endpoint_url="http://localhost:8000" for DynamoDB Local."""
+    import boto3
+
+    return boto3.client("dynamodb", endpoint_url=endpoint_url, region_name=region_name)
+
+
+def to_item(policy):
+    """Policy dict -> DynamoDB attribute-value map (floats become Decimals)."""
+    plain = json.loads(json.dumps(policy), parse_float=Decimal)
+    return {k: _serializer.serialize(v) for k, v in plain.items()}
+
+
+def iter_scored_policies(output):
+    """Flatten an enhanced/cleaned results file ({"accounts": {...}}) into policy dicts."""
+    for account in output.get("accounts", {}).values():
+        yield from account.get("policies", {}).values()
+
+
+def _write_batch(client, table_name, requests, max_retries):
+    """
+    Write one batch, retrying UnprocessedItems with exponential backoff + jitter.
+    Returns the number of retries it took.
+    """
+    retries = 0
+    while True:
+        resp = client.batch_write_item(RequestItems={table_name: requests})
+        requests = resp.get("UnprocessedItems", {}).get(table_name, [])
+        if not requests:
+            return retries
+        if retries == max_retries:
+            raise RuntimeError(f"{len(requests)} items still unprocessed after {max_retries} retries")
+        retries += 1
+        time.sleep(min(2.0, 0.05 * 2 ** retries) * random.random())
+
+
+def write_policies(policies, client, table_name=TABLE_NAME, workers=8, max_retries=8):
+    """
+    Bulk-load policies into table_name with 25-item BatchWriteItem calls
+    spread over a thread pool. Duplicate ids are collapsed (last one wins),
+    since DynamoDB rejects a batch that writes the same key twice.
+
+    Returns throughput metrics:
+    {"items", "batches", "retries", "seconds", "items_per_second"}
+    """
+    by_id = {p["id"]: p for p in policies}
+    requests = [{"PutRequest": {"Item": to_item(p)}} for p in by_id.values()]
+    batches = [requests[i:i + BATCH_SIZE] for i in range(0, len(requests), BATCH_SIZE)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        retries = sum(ex.map(lambda batch: _write_batch(client, table_name, batch, max_retries), batches))
+    seconds = time.perf_counter() - start
+
+    return {
+        "items": len(requests),
+        "batches": len(batches),
+        "retries": retries,
+        "seconds": round(seconds, 3),
+        "items_per_second": round(len(requests) / seconds, 1) if seconds > 0 else None,
+    }
+
+
+def main(path="results/cleaned_data.json", endpoint_url=None):
+    """Load a results file into main-table; endpoint_url defaults to $DYNAMODB_ENDPOINT (DynamoDB Local)."""
+    import os
+
+    with open(path, "r") as f:
+        output = json.load(f)
+
+    client = make_client(endpoint_url=endpoint_url or os.environ.get("DYNAMODB_ENDPOINT"))
+    metrics = write_policies(list(iter_scored_policies(output)), client)
+
+    print(f"Wrote {metrics['items']} policies to {TABLE_NAME} in {metrics['batches']} batches "
+          f"({metrics['retries']} retries, {metrics['seconds']}s, {metrics['items_per_second']} items/s)")
+    return metrics
+
+
+if __name__ == "__main__":
+    import sys
+
+    main(*sys.argv[1:])
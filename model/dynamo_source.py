@@ -0,0 +1,120 @@
+import queue
+import threading
+from decimal import Decimal
+
+from boto3.dynamodb.types import TypeDeserializer
+
+from .dynamo_sink import TABLE_NAME
+
+_deserializer = TypeDeserializer()
+_DONE = object()
+
+
+def _plain(value):
+    """Decimals back to int/float, recursively (what json.load would have produced)."""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    return value
+
+
+def from_item(item):
+    """DynamoDB attribute-value map -> policy dict."""
+    return {k: _plain(_deserializer.deserialize(v)) for k, v in item.items()}
+
+
+def _scan_segment(client, table_name, segment, total_segments, page_size, out, stop):
+    """Page through one scan segment, putting each page on out (blocks when it is full)."""
+    try:
+        start_key = None
+        while not stop.is_set():
+            kwargs = {"TableName": table_name, "Segment": segment,
+                      "TotalSegments": total_segments, "Limit": page_size}
+            if start_key:
+                kwargs["ExclusiveStartKey"] = start_key
+            resp = client.scan(**kwargs)
+            page = [from_item(item) for item in resp.get("Items", [])]
+            if page:
+                out.put(page)
+            start_key = resp.get("LastEvaluatedKey")
+            if not start_key:
+                break
+    except Exception as e:
+        out.put(e)
+    finally:
+        out.put(_DONE)
+
+
+def scan_pages(client, table_name=TABLE_NAME, segments=4, page_size=100, max_buffered_pages=8):
+    """
+    Parallel segmented scan of table_name, yielding pages (lists of policy dicts)
+    as soon as any segment returns one.
+
+    Each segment runs in its own thread; at most max_buffered_pages pages wait in
+    memory, so a slow consumer pauses the scanners instead of the whole table
+    being pulled in. Closing the generator early stops the scan.
+    """
+    out = queue.Queue(maxsize=max_buffered_pages)
+    stop = threading.Event()
+    threads = [
+        threading.Thread(
+            target=_scan_segment,
+            args=(client, table_name, seg, segments, page_size, out, stop),
+            daemon=True,
+        )
+        for seg in range(segments)
+    ]
+    for t in threads:
+        t.start()
+
+    running = segments
+    try:
+        while running:
+            page = out.get()
+            if page is _DONE:
+                running -= 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield page
+    finally:
+        stop.set()
+        # Unblock scanners waiting on a full queue so they can see stop
+        while running:
+            if out.get() is _DONE:
+                running -= 1
+
+
+def scan_policies(client, table_name=TABLE_NAME, **kwargs):
+    """Same as scan_pages(), one policy at a time."""
+    for page in scan_pages(client, table_name, **kwargs):
+        yield from page
+
+
+def main(endpoint_url=None, segments=4):
+    """Scan main-table and stream it into the local scorers; endpoint_url defaults to $DYNAMODB_ENDPOINT."""
+    import os
+
+    from .dynamo_sink import make_client
+    from .model import appetite_score
+    from .risk_score import calculate_risk_score
+
+    client = make_client(endpoint_url=endpoint_url or os.environ.get("DYNAMODB_ENDPOINT"))
+
+    count = in_appetite = 0
+    risk_total = 0.0
+    for page in scan_pages(client, segments=segments):
+        for p in page:
+            count += 1
+            in_appetite += appetite_score(p) > 0
+            risk_total += calculate_risk_score(p)
+
+    print(f"Scanned {count} policies from {TABLE_NAME}: {in_appetite} in appetite, "
+          f"avg risk score {risk_total / count if count else 0:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Template explanations built from the scorers' own factor breakdowns.
+
+Every policy gets "why surfaced" bullets in microseconds, with no API calls,
+from appetite_breakdown (which rules passed/failed, bonus bands hit) and
+risk_contributions (which factors earned or lost risk points). Chat
+narration in cohere_aggregate is an optional upgrade on top of these.
+"""
+from .model import appetite_breakdown
+from .risk_score import WEIGHT_PROFILES, risk_contributions, risk_factors
+
+STRENGTH = 0.7  # factor value at or above this is called out as a strength
+WEAKNESS = 0.5  # below this, a drag
+MAX_FACTORS = 3  # factors named per strengths/drags bullet
+
+# Appetite rules whose points go above the base award
+_BONUS = {"target_state": 0, "tiv": 10, "premium": 10, "building_age": 10}
+
+
+def _factor_detail(name, policy, value):
+    if name == "loss":
+        premium = float(policy.get("total_premium", 0) or 0)
+        loss_value = float(policy.get("loss_value", 0) or 0)
+        ratio = f"{loss_value / premium:.2f}" if premium > 0 else "n/a"
+        return f"loss ratio {ratio}"
+    if name == "tiv":
+        return f"TIV ${(policy.get('tiv', 0) or 0) / 1e6:.1f}M"
+    if name == "construction":
+        return f"{(policy.get('construction_type') or 'unknown').lower()} construction"
+    if name == "age":
+        return f"oldest building {policy.get('oldest_building', 'unknown')}"
+    if name == "state":
+        return f"{policy.get('primary_risk_state') or 'unknown'} location"
+    if name == "winnability":
+        return f"winnability {value * 100:.0f}%"
+    if name == "duration":
+        return f"term score {value:.2f}"
+    return name
+
+
+def score_breakdown(policy, weights=WEIGHT_PROFILES["default"]):
+    """{"appetite": appetite_breakdown rows, "risk": risk_contributions rows}."""
+    factors = risk_factors(policy)
+    return {
+        "appetite": appetite_breakdown(policy),
+        "risk": risk_contributions(policy, weights, factors),
+    }
+
+
+def explain(policy, breakdown=None, weights=WEIGHT_PROFILES["default"]):
+    """Short bullet points explaining the policy's appetite and risk scores."""
+    if breakdown is None:
+        breakdown = score_breakdown(policy, weights)
+    appetite = breakdown["appetite"]
+    risk = [r for r in breakdown["risk"] if r["weight"] > 0]
+    points = []
+
+    failed = [r["detail"] for r in appetite if not r["passed"]]
+    if failed:
+        points.append("Out of appetite: " + "; ".join(failed))
+    else:
+        score = min(sum(r["points"] for r in appetite), 100)
+        hits = [r["detail"] for r in appetite if r["factor"] in _BONUS and r["points"] > _BONUS[r["factor"]]]
+        points.append(f"In appetite ({score}/100)" + (": " + "; ".join(hits) if hits else ""))
+
+    def named(rows):
+        return ", ".join(
+            f"{_factor_detail(r['factor'], policy, r['value'])} ({r['points']:.1f}/{r['max_points']:.0f} pts)"
+            for r in rows[:MAX_FACTORS]
+        )
+
+    strengths = sorted((r for r in risk if r["value"] >= STRENGTH), key=lambda r: r["points"], reverse=True)
+    drags = sorted((r for r in risk if r["value"] < WEAKNESS), key=lambda r: r["max_points"] - r["points"], reverse=True)
+    if strengths:
+        points.append("Risk strengths: " + named(strengths))
+    if drags:
+        points.append("Risk drags: " + named(drags))
+    points.append(f"Risk score {sum(r['points'] for r in risk):.1f}/100")
+    return points
+
+
+def annotate(policies, weights=WEIGHT_PROFILES["default"], overwrite=False):
+    """
+    Set score_breakdown on every policy, and template justification_points
+    (explanation_engine = "template") wherever none exist yet or overwrite is set.
+    """
+    for p in policies:
+        breakdown = score_breakdown(p, weights)
+        p["score_breakdown"] = breakdown
+        if overwrite or not p.get("justification_points"):
+            p["justification_points"] = explain(p, breakdown)
+            p["explanation_engine"] = "template"
+    return policies
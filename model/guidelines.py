@@ -0,0 +1,28 @@
+# Appetite guidelines = rerank query
+GUIDELINES = """
+Carrier appetite:
+- Commercial Property
+- TIV > $10M
+- Loss ratio < 0.7
+- Construction: Fire Resistive or Non-Combustible preferred
+- Built after 1950
+- States: CA or TX prioritized
+"""
+
+# Underwriting rules from model.py::appetite_score, written as a guideline query
+TARGET_APPETITE = """
+Carrier appetite:
+- New business only, Commercial Property
+- States: OH, PA, MD, CO, CA, FL targeted; NC, SC, GA, VA, UT acceptable
+- TIV up to $150M, $50M–$100M targeted
+- Premium $75K–$1M targeted
+- Built 2010 or later preferred, nothing before 1990
+- Loss value under $100K
+- Construction: Joisted Masonry or Non-Combustible
+"""
+
+# Named guideline sets (one per carrier / market)
+GUIDELINE_SETS = {
+    "default": GUIDELINES,
+    "target_appetite": TARGET_APPETITE,
+}
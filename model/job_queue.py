@@ -0,0 +1,379 @@
+"""
+Local job queue for batch runs of the aggregate pipeline over many drops.
+
+Jobs are (input, guidelines, output) rows in a SQLite file. A worker pool
+claims queued jobs one at a time and runs cohere_aggregate.run on them
+(jobs writing the same output path run one after another);
+every worker shares one response cache (rerank scores per document, chat
+replies per prompt) and one parsed-input cache, so overlapping drops and
+repeated guideline sets don't pay for the same API calls or JSON parsing
+twice. Rerank calls go through one RerankGateway, so jobs ranking against
+the same guidelines at the same time are coalesced into one call. Each job records its status, queue wait and run time.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from types import SimpleNamespace
+
+DEFAULT_DB = "results/jobs.sqlite"
+DEFAULT_WORKERS = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    input_path TEXT NOT NULL,
+    guidelines TEXT NOT NULL,
+    output_path TEXT NOT NULL,
+    options TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'queued',
+    worker TEXT,
+    submitted_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    stats TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+
+def resolve_guidelines(spec):
+    """A GUIDELINE_SETS name, a path to a text file, or the guideline text itself."""
+    from .guidelines import GUIDELINE_SETS
+
+    if spec in GUIDELINE_SETS:
+        return GUIDELINE_SETS[spec]
+    if os.path.isfile(spec):
+        with open(spec, "r") as f:
+            return f.read()
+    return spec
+
+
+# ---------------------------
+# Queue
+# ---------------------------
+def _job(row):
+    """A jobs row as a dict with decoded options/stats and timings in seconds."""
+    job = dict(row)
+    job["options"] = json.loads(job["options"])
+    job["stats"] = json.loads(job["stats"]) if job["stats"] else None
+    job["wait_s"] = round(job["started_at"] - job["submitted_at"], 3) if job["started_at"] else None
+    job["run_s"] = (
+        round(job["finished_at"] - job["started_at"], 3) if job["finished_at"] and job["started_at"] else None
+    )
+    return job
+
+
+class JobQueue:
+    """SQLite-backed job table; safe to use from several threads and processes."""
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def submit(self, input_path, output_path, guidelines="default", **options):
+        """Queue one run of the pipeline; options are cohere_aggregate.run keywords. Returns the job id."""
+        with self._connect() as db:
+            cur = db.execute(
+                "INSERT INTO jobs (input_path, guidelines, output_path, options, submitted_at) VALUES (?, ?, ?, ?, ?)",
+                (input_path, guidelines, output_path, json.dumps(options), time.time()),
+            )
+            return cur.lastrowid
+
+    def claim(self, worker):
+        """
+        Atomically move the oldest queued job to running; None when nothing can
+        run. A job whose output path another job is still writing waits its turn.
+        """
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND output_path NOT IN "
+                "(SELECT output_path FROM jobs WHERE status = 'running') ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            db.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started_at = ? WHERE id = ?",
+                (worker, time.time(), row["id"]),
+            )
+            db.execute("COMMIT")
+            return _job(row)
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+    def finish(self, job_id, stats):
+        self._close(job_id, "done", stats=json.dumps(stats))
+
+    def fail(self, job_id, error):
+        self._close(job_id, "failed", error=error)
+
+    def _close(self, job_id, status, stats=None, error=None):
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, stats = ?, error = ? WHERE id = ?",
+                (status, time.time(), stats, error, job_id),
+            )
+
+    def requeue_stale(self):
+        """Put jobs left 'running' by a killed worker pool back in the queue; returns how many."""
+        with self._connect() as db:
+            return db.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, started_at = NULL WHERE status = 'running'"
+            ).rowcount
+
+    def jobs(self, status=None):
+        """Jobs (oldest first) with their timings in seconds."""
+        with self._connect() as db:
+            if status:
+                rows = db.execute("SELECT * FROM jobs WHERE status = ? ORDER BY id", (status,)).fetchall()
+            else:
+                rows = db.execute("SELECT * FROM jobs ORDER BY id").fetchall()
+        return [_job(row) for row in rows]
+
+
+# ---------------------------
+# Shared caches
+# ---------------------------
+class ResponseCache:
+    """Cohere responses shared by every job of a worker pool."""
+
+    def __init__(self):
+        self.rerank_scores = {}  # (model, query, document) -> relevance score
+        self.chat_replies = {}   # (model, messages, temperature) -> reply text
+        self.hits = {"rerank_documents": 0, "chat": 0}
+        self.misses = {"rerank_documents": 0, "chat": 0}
+        self.lock = threading.Lock()
+
+    def stats(self):
+        with self.lock:
+            return {"hits": dict(self.hits), "misses": dict(self.misses)}
+
+
+def _chat_key(kwargs):
+    return json.dumps([kwargs.get("model"), kwargs.get("messages"), kwargs.get("temperature")], sort_keys=True)
+
+
+class CachingClient:
+    """
+    Wraps a Cohere client (co.rerank / co.chat / co.chat_stream) with a
+    ResponseCache. Rerank relevance is per (query, document) pair, so only
+    documents not seen before are sent; cached chat replies are replayed,
+    for chat_stream as a single content delta.
+    """
+
+    def __init__(self, co, cache=None):
+        self.co = co
+        self.cache = cache or ResponseCache()
+
+    def rerank(self, model, query, documents, top_n=None, **kwargs):
+        cache = self.cache
+        keys = [(model, query, doc) for doc in documents]
+        with cache.lock:
+            # Position of the first occurrence of each uncached document
+            first = {}
+            for i, k in enumerate(keys):
+                if k not in cache.rerank_scores:
+                    first.setdefault(k, i)
+            cache.hits["rerank_documents"] += len(documents) - len(first)
+            cache.misses["rerank_documents"] += len(first)
+
+        if first:
+            todo = list(first.values())
+            resp = self.co.rerank(model=model, query=query, documents=[documents[i] for i in todo],
+                                  top_n=len(todo), **kwargs)
+            with cache.lock:
+                for r in resp.results:
+                    cache.rerank_scores[keys[todo[r.index]]] = r.relevance_score
+
+        with cache.lock:
+            scores = [cache.rerank_scores.get(k, 0.0) for k in keys]
+        ranked = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)
+        if top_n is not None:
+            ranked = ranked[:top_n]
+        return SimpleNamespace(results=[SimpleNamespace(index=i, relevance_score=scores[i]) for i in ranked])
+
+    def chat(self, **kwargs):
+        key = _chat_key(kwargs)
+        with self.cache.lock:
+            text = self.cache.chat_replies.get(key)
+            if text is not None:
+                self.cache.hits["chat"] += 1
+        if text is not None:
+            return SimpleNamespace(message=SimpleNamespace(content=[SimpleNamespace(text=text)]))
+
+        resp = self.co.chat(**kwargs)
+        with self.cache.lock:
+            self.cache.misses["chat"] += 1
+            self.cache.chat_replies[key] = resp.message.content[0].text
+        return resp
+
+    def chat_stream(self, **kwargs):
+        key = _chat_key(kwargs)
+        with self.cache.lock:
+            text = self.cache.chat_replies.get(key)
+            if text is not None:
+                self.cache.hits["chat"] += 1
+        if text is not None:
+            yield SimpleNamespace(type="content-delta",
+                                  delta=SimpleNamespace(message=SimpleNamespace(content=SimpleNamespace(text=text))))
+            yield SimpleNamespace(type="message-end", delta=SimpleNamespace(usage=None))
+            return
+
+        parts = []
+        for event in self.co.chat_stream(**kwargs):
+            if getattr(event, "type", None) == "content-delta":
+                parts.append(event.delta.message.content.text or "")
+            yield event
+        # Only complete replies are cached
+        with self.cache.lock:
+            self.cache.misses["chat"] += 1
+            self.cache.chat_replies[key] = "".join(parts)
+
+
+class DataCache:
+    """Parsed input files, keyed by path + mtime + size so a rewritten drop is re-read."""
+
+    def __init__(self):
+        self._files = {}  # key -> Future of the parsed policies
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def policies(self, path):
+        """
+        The drop's policies; each call gets its own shallow copies to annotate.
+        Concurrent cold reads of one file parse it once; the others wait for it.
+        """
+        from concurrent.futures import Future
+
+        st = os.stat(path)
+        key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+        with self.lock:
+            future = self._files.get(key)
+            loader = future is None
+            if loader:
+                future = self._files[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+        if loader:
+            try:
+                with open(path, "r") as f:
+                    future.set_result(json.load(f)["output"][0]["data"])
+            except BaseException as e:
+                with self.lock:
+                    del self._files[key]  # let the next call retry
+                future.set_exception(e)
+                raise
+        return [dict(p) for p in future.result()]
+
+
+# ---------------------------
+# Workers
+# ---------------------------
+def run_job(job, co, data, rerank_fn=None):
+    """Run one claimed job; returns its stats."""
+    from .cohere_aggregate import run
+
+    policies = data.policies(job["input_path"])
+    output = run(
+        job["input_path"], job["output_path"], guidelines=resolve_guidelines(job["guidelines"]),
+        policies=policies, co=co, rerank_fn=rerank_fn, **job["options"],
+    )
+    accounts = output["accounts"]
+    return {
+        "policies_in": len(policies),
+        "accounts": len(accounts),
+        "policies_out": sum(len(a["policies"]) for a in accounts.values()),
+    }
+
+
+def worker_loop(queue, name, co, data, drain=True, poll=1.0, rerank_fn=None):
+    """Claim and run jobs until the queue is empty (drain) or forever."""
+    done = 0
+    while True:
+        job = queue.claim(name)
+        if job is None:
+            if drain:
+                return done
+            time.sleep(poll)
+            continue
+        print(f"[{name}] job {job['id']}: {job['input_path']} -> {job['output_path']}")
+        try:
+            queue.finish(job["id"], run_job(job, co, data, rerank_fn))
+        except Exception:
+            queue.fail(job["id"], traceback.format_exc())
+            print(f"[{name}] job {job['id']} failed")
+        done += 1
+
+
+def run_workers(db_path=DEFAULT_DB, workers=DEFAULT_WORKERS, drain=True, client=None):
+    """
+    Worker pool over the queue at db_path. All workers share one Cohere
+    client (with its concurrency limit and breaker) behind one response
+    cache, one rerank gateway and one parsed-data cache. Returns (jobs run,
+    cache stats).
+    """
+    from .cohere_client import get_client
+    from .rerank import rerank_with_fallback
+    from .rerank_gateway import RerankGateway
+
+    queue = JobQueue(db_path)
+    stale = queue.requeue_stale()
+    if stale:
+        print(f"Requeued {stale} jobs left running by a previous pool")
+
+    responses = ResponseCache()
+    co = CachingClient(client or get_client(), responses)
+    data = DataCache()
+    gateway = RerankGateway(lambda query, documents: rerank_with_fallback(co, query, documents))
+
+    counts = [0] * workers
+
+    def work(i):
+        counts[i] = worker_loop(queue, f"worker-{i}", co, data, drain=drain, rerank_fn=gateway.rerank)
+
+    threads = [threading.Thread(target=work, args=(i,), daemon=True) for i in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = {**responses.stats(), "rerank_gateway": dict(gateway.stats),
+             "parsed_data": {"hits": data.hits, "misses": data.misses}}
+    return sum(counts), stats
+
+
+def print_jobs(queue):
+    for job in queue.jobs():
+        timing = f"wait {job['wait_s']}s, run {job['run_s']}s" if job["run_s"] is not None else ""
+        print(f"#{job['id']} {job['status']:<7} {job['input_path']} -> {job['output_path']} "
+              f"[{job['guidelines'][:24]!r}] {timing} {job['stats'] or ''}".rstrip())
+        if job["error"]:
+            print("    " + job["error"].strip().splitlines()[-1])
+
+
+def main(db_path=DEFAULT_DB, workers=DEFAULT_WORKERS):
+    start = time.perf_counter()
+    ran, stats = run_workers(db_path, workers)
+    print(f"Ran {ran} jobs with {workers} workers in {time.perf_counter() - start:.1f}s; caches: {stats}")
+    print_jobs(JobQueue(db_path))
+
+
+if __name__ == "__main__":
+    main()
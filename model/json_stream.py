@@ -0,0 +1,87 @@
+"""
+Incremental JSON parsing for streamed chat replies.
+
+The chat stages ask for {"points": [...]} or {"references": [...]}. ArrayStream
+is fed the reply text as it arrives and hands back each element of the named
+array as soon as its closing quote or brace has streamed in, so consumers see the
+first point long before the reply finishes, and whatever completed before a
+dropped stream is kept.
+"""
+import json
+import re
+
+
+class ArrayStream:
+    """
+    Scanner for the elements of the array under `key` in a streamed JSON object.
+    Text before the array (markdown fences, preambles) is skipped. Each
+    character is looked at once; only complete elements are json-decoded.
+    """
+
+    def __init__(self, key):
+        self._opening = re.compile(r'"' + re.escape(key) + r'"\s*:\s*\[')
+        self.text = ""
+        self.items = []
+        self.closed = False  # the array's "]" has been seen
+        self._pos = 0        # next character to scan
+        self._start = None   # offset of the element being scanned
+        self._depth = 0      # nesting inside the current element
+        self._in_string = False
+        self._escaped = False
+        self._opened = False
+
+    def feed(self, delta):
+        """Add streamed text; returns the elements it completed."""
+        self.text += delta
+        if not self._opened:
+            match = self._opening.search(self.text)
+            if match is None:
+                return []
+            self._opened = True
+            self._pos = match.end()
+
+        done = []
+        text = self.text
+        while self._pos < len(text) and not self.closed:
+            ch = text[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 0:
+                        self._emit(done, self._pos + 1)  # string element
+            elif ch == '"':
+                self._in_string = True
+                if self._start is None:
+                    self._start = self._pos
+            elif ch in "[{":
+                if self._start is None:
+                    self._start = self._pos
+                self._depth += 1
+            elif ch in "]}" and self._depth:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(done, self._pos + 1)  # object / array element
+            elif self._depth == 0 and ch in ",]":
+                # Element boundary at array level
+                self._emit(done, self._pos)
+                self.closed = ch == "]"
+            elif self._start is None and not ch.isspace():
+                self._start = self._pos  # number / true / false / null
+            self._pos += 1
+        return done
+
+    def _emit(self, done, end):
+        if self._start is None:
+            return
+        raw = self.text[self._start:end].strip()
+        self._start = None
+        try:
+            item = json.loads(raw)
+        except ValueError:
+            return  # malformed element: skip it, keep the rest of the stream
+        self.items.append(item)
+        done.append(item)
@@ -0,0 +1,175 @@
+"""
+Reuse tier for LLM justifications.
+
+Policies are bucketed by a feature signature (state, LOB, construction, TIV
+band, loss-ratio band by default). The chat model is called once per bucket
+and asked to write numbers as placeholders ({tiv}, {premium}, ...), which are
+filled in per policy. After `cap` policies have used a bucket's output the
+next one triggers a fresh generation, so the cap sets how coarse reuse is
+(cap=1 means no reuse). Output that still has literal figures outside the
+placeholders is kept for its own policy only and never reused.
+"""
+import bisect
+import re
+
+TIV_BANDS = [1_000_000, 5_000_000, 10_000_000, 25_000_000, 50_000_000, 100_000_000]
+LOSS_RATIO_STEP = 0.25
+LOSS_RATIO_MAX_BAND = 8  # everything above 2.0 shares one band
+
+
+def _loss_ratio(p):
+    premium = float(p.get("total_premium", 0) or 0)
+    loss_value = float(p.get("loss_value", 0) or 0)
+    return loss_value / premium if premium > 0 else None
+
+
+def _tiv_band(p):
+    return bisect.bisect_right(TIV_BANDS, p.get("tiv", 0) or 0)
+
+
+def _loss_ratio_band(p):
+    ratio = _loss_ratio(p)
+    return None if ratio is None else min(int(ratio / LOSS_RATIO_STEP), LOSS_RATIO_MAX_BAND)
+
+
+# Named signature features: name -> policy -> hashable bucket value
+FEATURES = {
+    "state": lambda p: p.get("primary_risk_state"),
+    "line_of_business": lambda p: (p.get("line_of_business") or "").upper(),
+    "construction": lambda p: (p.get("construction_type") or "").upper(),
+    "tiv_band": _tiv_band,
+    "loss_ratio_band": _loss_ratio_band,
+    "building_decade": lambda p: (p.get("oldest_building") or 0) // 10 * 10,
+    "business_type": lambda p: p.get("renewal_or_new_business"),
+}
+
+DEFAULT_FEATURES = ("state", "line_of_business", "construction", "tiv_band", "loss_ratio_band")
+DEFAULT_CAP = 50
+
+
+# ---------------------------
+# Placeholders
+# ---------------------------
+def placeholder_values(p):
+    """Per-policy values substituted into a bucket's templated output."""
+    ratio = _loss_ratio(p)
+    winnability = p.get("winnability")
+    if isinstance(winnability, (int, float)) and winnability <= 1:
+        winnability *= 100
+    return {
+        "tiv": f"${p.get('tiv', 0) or 0:,.0f}",
+        "premium": f"${float(p.get('total_premium', 0) or 0):,.2f}",
+        "loss_value": f"${float(p.get('loss_value', 0) or 0):,.2f}",
+        "loss_ratio": "n/a" if ratio is None else f"{ratio:.2f}",
+        "building_year": str(p.get("oldest_building", "")),
+        "winnability": "n/a" if winnability is None else f"{winnability:.0f}%",
+        "state": str(p.get("primary_risk_state", "")),
+    }
+
+
+TEMPLATE_HINT = (
+    "Write policy-specific numbers as placeholders instead of literal values: "
+    + ", ".join("{" + name + "}" for name in placeholder_values({}))
+    + ". They are filled in per policy."
+)
+
+_PLACEHOLDER = re.compile(r"\{(" + "|".join(placeholder_values({})) + r")\}")
+
+
+def literal_figures(template):
+    """Digits left in a template outside its placeholders (link URLs excepted)."""
+    if isinstance(template, str):
+        return re.findall(r"\d+(?:[.,]\d+)*", _PLACEHOLDER.sub("", template))
+    if isinstance(template, list):
+        return [d for t in template for d in literal_figures(t)]
+    if isinstance(template, dict):
+        return [d for k, v in template.items() if k != "link" for d in literal_figures(v)]
+    return []
+
+
+def fill(template, p):
+    """Substitute placeholders throughout a (nested) JSON-like template."""
+    values = placeholder_values(p)
+    if isinstance(template, str):
+        return _PLACEHOLDER.sub(lambda m: values[m.group(1)], template)
+    if isinstance(template, list):
+        return [fill(t, p) for t in template]
+    if isinstance(template, dict):
+        return {k: fill(v, p) for k, v in template.items()}
+    return template
+
+
+# ---------------------------
+# Cache
+# ---------------------------
+def signature(p, features=DEFAULT_FEATURES):
+    return tuple(FEATURES[name](p) for name in features)
+
+
+class JustificationCache:
+    """
+    Bucketed LLM output. explain() fills a policy's fields from its bucket's
+    template, calling generate() only when the bucket is new or full.
+    """
+
+    def __init__(self, features=DEFAULT_FEATURES, cap=DEFAULT_CAP, fields=("justification_points", "references")):
+        unknown = [f for f in features if f not in FEATURES]
+        if unknown:
+            raise ValueError(f"Unknown signature features {unknown}; choose from {sorted(FEATURES)}")
+        self.features = tuple(features)
+        self.cap = max(1, cap)
+        self.fields = fields
+        self.buckets = {}   # signature -> currently open entry
+        self.reused_by = {}  # source policy id -> ids that reused its output
+        self.calls = 0
+        self.reused = 0
+        self.rejected = 0  # generations not cached because they held literal figures
+
+    def explain(self, p, generate):
+        """
+        generate(p) must set self.fields on p using TEMPLATE_HINT placeholders.
+        Sets the filled fields on p plus p["justification_cache"] recording
+        the bucket, the policy the output was generated for, and whether it was reused.
+        Output with literal figures (another policy's TIV, year, ...) is not cached.
+        """
+        key = signature(p, self.features)
+        entry = self.buckets.get(key)
+        reused = entry is not None and entry["uses"] < self.cap
+
+        if not reused:
+            generate(p)
+            entry = {
+                "template": {f: p.get(f) for f in self.fields},
+                "source": p["id"],
+                "uses": 0,
+            }
+            self.reused_by[p["id"]] = []
+            self.calls += 1
+            if literal_figures(entry["template"]):
+                # Figures specific to p: fine for p, wrong for the rest of the bucket
+                self.rejected += 1
+                self.buckets.pop(key, None)
+            else:
+                self.buckets[key] = entry
+        else:
+            self.reused_by[entry["source"]].append(p["id"])
+            self.reused += 1
+
+        entry["uses"] += 1
+        p.update(fill(entry["template"], p))
+        p["justification_cache"] = {
+            "bucket": dict(zip(self.features, key)),
+            "source_policy": entry["source"],
+            "reused": reused,
+        }
+
+    def stats(self):
+        served = self.calls + self.reused
+        return {
+            "policies": served,
+            "generations": self.calls,
+            "reused": self.reused,
+            "rejected": self.rejected,
+            "buckets": len(self.buckets),
+            "reduction": round(served / self.calls, 2) if self.calls else None,
+        }
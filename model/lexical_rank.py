@@ -0,0 +1,82 @@
+import re
+from collections import defaultdict
+from itertools import chain
+
+import numpy as np
+from scipy import sparse
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Raw BM25 s maps to s / (s + SCORE_K): fixed, so scores compare across calls.
+# 7.5 puts the guideline query's median / p90 / p99 over results/data.json at
+# about 0.21 / 0.38 / 0.52, close to Cohere's rerank scores on the same book.
+SCORE_K = 7.5
+
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens ("Non-Combustible" -> ["non", "combustible"])."""
+    return TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Offline BM25 ranker over a fixed set of documents.
+
+    The documents are tokenized into a sparse doc×term count matrix once;
+    scoring a query only touches the columns of terms that appear in it,
+    so the same index can answer many queries cheaply.
+    """
+
+    def __init__(self, documents, k1=1.5, b=0.75, score_k=SCORE_K):
+        self.k1 = k1
+        self.b = b
+        self.score_k = score_k
+        self.n_docs = len(documents)
+
+        doc_tokens = [tokenize(doc) for doc in documents]
+        # Unseen tokens get the next free column id
+        self.vocab = defaultdict()
+        self.vocab.default_factory = self.vocab.__len__
+        cols = np.array([self.vocab[t] for t in chain.from_iterable(doc_tokens)], dtype=np.int64)
+        lengths = np.fromiter((len(t) for t in doc_tokens), dtype=np.int64, count=self.n_docs)
+        rows = np.repeat(np.arange(self.n_docs), lengths)
+        self.vocab.default_factory = None
+
+        # Duplicate (row, col) entries are summed into term counts
+        self.tf = sparse.csc_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(self.n_docs, max(len(self.vocab), 1)),
+        )
+        self.doc_len = lengths.astype(np.float64)
+        self.avg_len = self.doc_len.mean() if self.n_docs and self.doc_len.mean() > 0 else 1.0
+
+    def scores(self, query):
+        """BM25 score of every document for query, mapped to 0–1 by s / (s + score_k)."""
+        if not self.n_docs:
+            return []
+
+        query_cols = sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab})
+        if not query_cols:
+            return [0.0] * self.n_docs
+
+        q = self.tf[:, query_cols]
+        df = np.diff(q.indptr)
+        idf = np.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+        # BM25 term saturation, applied to the non-zero entries only
+        q = q.tocoo()
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len[q.row] / self.avg_len)
+        weights = q.data * (self.k1 + 1) / (q.data + norm) * idf[q.col]
+        scores = np.bincount(q.row, weights=weights, minlength=self.n_docs)
+
+        # Not max-normalized: the best document of a weak match stays low
+        scores = scores / (scores + self.score_k)
+        return np.round(scores, 6).tolist()
+
+
+def bm25_scores(query, documents, k1=1.5, b=0.75, score_k=SCORE_K):
+    """
+    Offline BM25 relevance of each document to query, in 0–1 on a fixed scale
+    (see SCORE_K). Scores are aligned with documents.
+    """
+    return BM25Index(documents, k1=k1, b=b, score_k=score_k).scores(query)
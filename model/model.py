@@ -63,87 +63,98 @@ def filter_policies(policies):
 
 
 
-def appetite_score(policy):
+ACCEPTABLE_STATES = {"OH", "PA", "MD", "CO", "CA", "FL", "NC", "SC", "GA", "VA", "UT"}
+TARGET_STATES = {"OH", "PA", "MD", "CO", "CA", "FL"}
+# Matched against construction_type.upper(), so these must be upper case
+PREFERRED_CONSTRUCTION = {"JM", "JOISTED MASONRY", "NON-COMBUSTIBLE", "MASONRY NON-COMBUSTIBLE"}
+
+
+def appetite_breakdown(policy):
     """
-    Compute an Appetite Score (0–100) for a policy record
-    based on underwriting guidelines.
-    Higher = closer to target appetite.
-    Score of 0 means Out-of-Appetite.
+    Per-rule contributions to the Appetite Score, as a list of
+    {"factor", "points", "passed", "detail"} (failed rules score 0 points).
+    Unlike appetite_score this evaluates every rule, so an explanation can
+    name all the reasons a policy is out of appetite.
     """
+    rows = []
 
-    score = 0
+    def rule(factor, points, passed, detail):
+        rows.append({"factor": factor, "points": points if passed else 0, "passed": passed, "detail": detail})
 
     # --- Submission Type ---
-    if policy.get("renewal_or_new_business") != "NEW_BUSINESS":
-        return 0  # Renewal = Out-of-Appetite
-    score += 10
-
+    submission = policy.get("renewal_or_new_business")
+    rule("submission_type", 10, submission == "NEW_BUSINESS",
+         "new business" if submission == "NEW_BUSINESS" else f"{submission or 'unknown'} submission (new business only)")
 
     # --- Line of Business ---
-    if policy.get("line_of_business") != "COMMERCIAL PROPERTY":
-        return 0  # Only property acceptable
-    score += 10
-
+    lob = policy.get("line_of_business")
+    rule("line_of_business", 10, lob == "COMMERCIAL PROPERTY",
+         "commercial property" if lob == "COMMERCIAL PROPERTY" else f"{lob or 'unknown'} line (property only)")
 
     # --- Primary Risk State ---
-    acceptable_states = {"OH", "PA", "MD", "CO", "CA", "FL", "NC", "SC", "GA", "VA", "UT"}
-    target_states = {"OH", "PA", "MD", "CO", "CA", "FL"}
     state = policy.get("primary_risk_state")
-    if state not in acceptable_states:
-        return 0
-    score += 10
-    if state in target_states:
-        score += 5  # target bonus
-
+    rule("state", 10, state in ACCEPTABLE_STATES,
+         f"{state} is an acceptable state" if state in ACCEPTABLE_STATES else f"{state or 'unknown'} is outside acceptable states")
+    rule("target_state", 5 if state in TARGET_STATES else 0, True,
+         f"{state} is a target state" if state in TARGET_STATES else "not a target state")
 
     # --- TIV (Total Insured Value) ---
-    tiv = policy.get("tiv", 0)
+    tiv = policy.get("tiv", 0) or 0
     if tiv > 150_000_000:
-        return 0
+        rule("tiv", 0, False, f"TIV ${tiv / 1e6:.1f}M above $150M limit")
     elif 50_000_000 <= tiv <= 100_000_000:
-        score += 15  # target
+        rule("tiv", 15, True, f"TIV ${tiv / 1e6:.1f}M in $50M-$100M target band")
     else:
-        score += 10  # acceptable
+        rule("tiv", 10, True, f"TIV ${tiv / 1e6:.1f}M acceptable")
 
     # --- Premium ---
-    premium = policy.get("total_premium", 0)
-    # premium with commas as in 1,000,000
-    print(f"Premium: {premium:,}")
+    premium = policy.get("total_premium", 0) or 0
     if premium < 50_000 or premium > 1_705_000:
-        return 0
+        rule("premium", 0, False, f"premium ${premium:,.0f} outside $50K-$1.705M")
     elif 75_000 <= premium <= 1_000_000:
-        score += 15  # target
+        rule("premium", 15, True, f"premium ${premium:,.0f} in $75K-$1M target band")
     else:
-        score += 10  # acceptable
+        rule("premium", 10, True, f"premium ${premium:,.0f} acceptable")
 
     # --- Building Age ---
-    building_year = policy.get("oldest_building", 0)
+    building_year = policy.get("oldest_building", 0) or 0
     if building_year < 1990:
-        return 0
+        rule("building_age", 0, False, f"oldest building {building_year} predates 1990")
     elif building_year >= 2010:
-        score += 15  # target
+        rule("building_age", 15, True, f"oldest building {building_year} (2010 or newer)")
     else:
-        score += 10  # acceptable
+        rule("building_age", 10, True, f"oldest building {building_year} acceptable")
 
     # --- Loss Value ---
     try:
         loss_value = float(policy.get("loss_value", "0"))
-    except ValueError:
+    except (TypeError, ValueError):
         loss_value = 0.0
-    if loss_value > 100_000:
-        return 0
-    score += 10
+    rule("loss_value", 10, loss_value <= 100_000,
+         f"losses ${loss_value:,.0f}" + (" within $100K limit" if loss_value <= 100_000 else " above $100K limit"))
 
     # --- Construction Type ---
-    ct = policy.get("construction_type", "").upper()
-    preferred_types = {"JM", "Joisted Masonry", "Non-Combustible", "Masonry Non-Combustible"}
-    if any(t in ct for t in preferred_types):
-        score += 10
-    else:
+    ct = (policy.get("construction_type") or "").upper()
+    preferred = any(t in ct for t in PREFERRED_CONSTRUCTION)
+    rule("construction", 10, preferred,
+         f"{ct.title() or 'unknown'} construction" + ("" if preferred else " not a preferred type"))
+
+    return rows
+
+
+def appetite_score(policy):
+    """
+    Compute an Appetite Score (0–100) for a policy record
+    based on underwriting guidelines.
+    Higher = closer to target appetite.
+    Score of 0 means Out-of-Appetite (any rule in appetite_breakdown failed).
+    """
+    rows = appetite_breakdown(policy)
+    if not all(r["passed"] for r in rows):
         return 0
 
     # Cap score at 100
-    return min(score, 100)
+    return min(sum(r["points"] for r in rows), 100)
 
 
 def is_in_appetite(policy):
@@ -174,17 +185,22 @@ def is_in_appetite(policy):
 #     print(f"HTTP Error: {err}")
 #     print(f"Response Text: {err.response.text}")
 
-import json
+def main(input_path="model/data.json"):
+    import json
 
-with open("model/data.json", "r") as f:
-    data = json.load(f)
+    with open(input_path, "r") as f:
+        data = json.load(f)
 
+    # Get policies
+    policies = data["output"][0]["data"]
 
-# Get policies
-policies = data["output"][0]["data"]
+    # Filter them
+    in_appetite, out_appetite = filter_policies(policies)
+
+    print(f"In-Appetite: {len(in_appetite)} policies")
+    print(f"Out-of-Appetite: {len(out_appetite)} policies")
+    return in_appetite, out_appetite
 
-# Filter them
-in_appetite, out_appetite = filter_policies(policies)
 
-print(f"In-Appetite: {len(in_appetite)} policies")
-print(f"Out-of-Appetite: {len(out_appetite)} policies")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from .policy_docs import policy_yaml
+
+
+def rerank_guideline_sets(policies, guideline_sets, rerank_fn, max_workers=4):
+    """
+    Rerank one book against several named guideline sets concurrently.
+
+    The policy docs are serialized once and shared by every rerank call.
+    rerank_fn(query, documents) must return (scores, engine).
+
+    Sets on every policy:
+    - "guideline_relevance": {guideline name: relevance}
+    - "best_guideline": name of the best-fitting guideline set
+
+    Returns (table, engines): one row per policy with a relevance column per
+    guideline set plus "best_guideline", and {guideline name: engine}.
+    """
+    names = list(guideline_sets)
+    if not names:
+        raise ValueError("guideline_sets is empty")
+
+    docs = [policy_yaml(p) for p in policies]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(names))) as ex:
+        futures = {name: ex.submit(rerank_fn, guideline_sets[name], docs) for name in names}
+        results = {name: futures[name].result() for name in names}
+
+    engines = {name: results[name][1] for name in names}
+
+    table = []
+    for i, p in enumerate(policies):
+        relevance = {name: results[name][0][i] for name in names}
+        best = max(names, key=relevance.get)
+        p["guideline_relevance"] = relevance
+        p["best_guideline"] = best
+        table.append({"id": p["id"], **relevance, "best_guideline": best})
+
+    return table, engines
+
+
+def main(input_path="results/data.json", sets_path=None, output_path="results/guideline_fit.json"):
+    """sets_path: optional JSON file of {name: guideline text} (defaults to GUIDELINE_SETS)."""
+    import json
+    from collections import Counter
+
+    from .cohere_client import get_client
+    from .guidelines import GUIDELINE_SETS
+    from .rerank import rerank_with_fallback
+
+    co = get_client()
+
+    guideline_sets = GUIDELINE_SETS
+    if sets_path:
+        with open(sets_path, "r") as f:
+            guideline_sets = json.load(f)
+
+    with open(input_path, "r") as f:
+        data = json.load(f)
+
+    policies = data["output"][0]["data"]
+
+    def rerank_fn(query, documents):
+        return rerank_with_fallback(co, query, documents)
+
+    table, engines = rerank_guideline_sets(policies, guideline_sets, rerank_fn)
+
+    with open(output_path, "w") as f:
+        json.dump({"guidelines": list(guideline_sets), "engines": engines, "policies": table}, f, indent=2)
+
+    print("Best-fit guideline counts:", dict(Counter(row["best_guideline"] for row in table)))
+    print(f"Saved {output_path} for {len(table)} policies x {len(guideline_sets)} guideline sets.")
+
+
+if __name__ == "__main__":
+    import sys
+
+    main(*sys.argv[1:])
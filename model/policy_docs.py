@@ -0,0 +1,65 @@
+def policy_doc(p):
+    """Fields of a policy that are shown to the reranker and chat prompts."""
+    return {
+        "PolicyID": p["id"],
+        "LineOfBusiness": p.get("line_of_business"),
+        "State": p.get("primary_risk_state"),
+        "TIV": p.get("tiv"),
+        "Premium": p.get("total_premium"),
+        "LossValue": p.get("loss_value"),
+        "Construction": p.get("construction_type"),
+        "BuildingYear": p.get("oldest_building"),
+        "Winnability": p.get("winnability"),
+    }
+
+
+def policy_yaml(p):
+    """YAML document for a single policy (same layout the scripts always sent)."""
+    import yaml
+
+    return yaml.dump(policy_doc(p), sort_keys=False)
+
+
+# One-line encoding for chat prompts: short keys and rounded money, explained
+# once in the system preamble (POLICY_LINE_LEGEND) instead of per policy.
+POLICY_LINE_LEGEND = "Policy keys: lr=loss ratio, yr=oldest building, win=winnability, new=new business."
+
+# Dropped first when a prompt is over its token ceiling
+POLICY_LINE_OPTIONAL = ("new", "win", "yr", "cons", "loss")
+
+
+def _money(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return "?"
+    if value >= 1e6:
+        return f"{value / 1e6:.2f}M"
+    if value >= 1e3:
+        return f"{value / 1e3:.0f}K"
+    return f"{value:.0f}"
+
+
+def policy_line(p, drop=()):
+    """'id=956 lob=GENERAL LIABILITY state=CA tiv=57.08M premium=1.38M ...'"""
+    try:
+        ratio = f"{float(p.get('loss_value') or 0) / float(p.get('total_premium') or 0):.2f}"
+    except (TypeError, ValueError, ZeroDivisionError):
+        ratio = "?"
+    winnability = p.get("winnability")
+    if isinstance(winnability, (int, float)):
+        winnability = f"{winnability if winnability > 1 else winnability * 100:.0f}%"
+    fields = {
+        "id": p["id"],
+        "lob": p.get("line_of_business"),
+        "state": p.get("primary_risk_state"),
+        "tiv": _money(p.get("tiv")),
+        "premium": _money(p.get("total_premium")),
+        "loss": _money(p.get("loss_value")),
+        "lr": ratio,
+        "cons": p.get("construction_type"),
+        "yr": p.get("oldest_building"),
+        "win": winnability,
+        "new": "y" if p.get("renewal_or_new_business") == "NEW_BUSINESS" else "n",
+    }
+    return " ".join(f"{k}={v}" for k, v in fields.items() if k not in drop and v is not None)
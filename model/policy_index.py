@@ -0,0 +1,221 @@
+"""
+Sorted-array indexes for dashboard range queries ("TIV between 50M and
+100M", "effective in the next 30 days", "active on a date").
+
+Each field keeps its values sorted alongside the policy ids, so one range
+is two bisects plus the k matching ids. A combined query counts every range
+in O(log n), enumerates only the most selective one and checks the other
+bounds per candidate. Indexes are published as <results>.index.json next to
+the results they were built from, together with each policy's term in days.
+They are versioned snapshots like the results (see snapshots), and each
+records the results version it describes in "results_version".
+"""
+import os
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+
+from . import snapshots
+
+NUMERIC_FIELDS = ("tiv", "total_premium", "oldest_building")
+DATE_FIELDS = ("effective_date", "expiration_date")
+FIELDS = NUMERIC_FIELDS + DATE_FIELDS + ("term_days",)
+
+INDEX_VERSION = 1
+
+
+def _day(value):
+    """'2025-08-06T00:00:00.000Z' -> '2025-08-06' (ISO days sort as strings)."""
+    if not isinstance(value, str) or len(value) < 10:
+        return None
+    try:
+        return date.fromisoformat(value[:10]).isoformat()
+    except ValueError:
+        return None
+
+
+def field_values(p):
+    """Indexed values of one policy; None where the field is missing or invalid."""
+    row = {}
+    for f in NUMERIC_FIELDS:
+        v = p.get(f)
+        row[f] = v if isinstance(v, (int, float)) and not isinstance(v, bool) else None
+    for f in DATE_FIELDS:
+        row[f] = _day(p.get(f))
+    eff, exp = row["effective_date"], row["expiration_date"]
+    row["term_days"] = (date.fromisoformat(exp) - date.fromisoformat(eff)).days if eff and exp else None
+    return row
+
+
+def policies_from(data):
+    """Policies from either the raw export or the enhanced {"accounts": ...} layout."""
+    if "accounts" in data:
+        return [p for acc in data["accounts"].values() for p in acc.get("policies", {}).values()]
+    return data["output"][0]["data"]
+
+
+def parse_bound(field, text):
+    """
+    CLI bound for a field: a number, an ISO date, or today / today+N / today-N
+    for date fields. Empty means open-ended.
+    """
+    text = (text or "").strip()
+    if not text:
+        return None
+    if field in DATE_FIELDS:
+        if text.startswith("today"):
+            offset = int(text[5:] or 0)
+            return (date.today() + timedelta(days=offset)).isoformat()
+        return _day(text) or text
+    return float(text)
+
+
+class SortedIndex:
+    """One field's values in sorted order, with the policy id at each position."""
+
+    __slots__ = ("values", "ids")
+
+    def __init__(self, values, ids):
+        self.values = values
+        self.ids = ids
+
+    @classmethod
+    def build(cls, pairs):
+        pairs = sorted(pairs, key=lambda vi: vi[0])
+        return cls([v for v, _ in pairs], [i for _, i in pairs])
+
+    def span(self, lo=None, hi=None):
+        """Positions [start, end) of values with lo <= value <= hi (None = open)."""
+        start = 0 if lo is None else bisect_left(self.values, lo)
+        end = len(self.values) if hi is None else bisect_right(self.values, hi)
+        return start, max(start, end)
+
+    def count(self, lo=None, hi=None):
+        start, end = self.span(lo, hi)
+        return end - start
+
+    def range(self, lo=None, hi=None):
+        start, end = self.span(lo, hi)
+        return self.ids[start:end]
+
+
+class PolicyIndex:
+    def __init__(self, fields, rows):
+        self.fields = fields  # name -> SortedIndex
+        self.rows = rows      # id -> {field: value}
+
+    @classmethod
+    def from_policies(cls, policies):
+        rows = {p["id"]: field_values(p) for p in policies}
+        fields = {
+            f: SortedIndex.build((row[f], pid) for pid, row in rows.items() if row[f] is not None)
+            for f in FIELDS
+        }
+        return cls(fields, rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def query(self, **ranges):
+        """
+        Ids of policies inside every range, e.g.
+        query(tiv=(50e6, 100e6), effective_date=("2025-09-01", "2025-09-30")).
+        Bounds are inclusive; None leaves a side open. Results follow the
+        order of the most selective field.
+        """
+        unknown = [f for f in ranges if f not in self.fields]
+        if unknown:
+            raise ValueError(f"Unknown index fields {unknown}; choose from {list(FIELDS)}")
+        if not ranges:
+            return list(self.rows)
+
+        # Drive from the range with the fewest matches, filter by the others
+        driver = min(ranges, key=lambda f: self.fields[f].count(*ranges[f]))
+        rest = [(f, lo, hi) for f, (lo, hi) in ranges.items() if f != driver]
+        out = []
+        for pid in self.fields[driver].range(*ranges[driver]):
+            row = self.rows[pid]
+            if all(
+                row[f] is not None and (lo is None or row[f] >= lo) and (hi is None or row[f] <= hi)
+                for f, lo, hi in rest
+            ):
+                out.append(pid)
+        return out
+
+    def active_on(self, day):
+        """Policies in force on day (effective_date <= day <= expiration_date)."""
+        return self.query(effective_date=(None, day), expiration_date=(day, None))
+
+    def term_days(self, policy_id):
+        return self.rows[policy_id]["term_days"]
+
+    # ---------------------------
+    # Persistence
+    # ---------------------------
+    def to_json(self, results_version=None):
+        return {
+            "version": INDEX_VERSION,
+            "results_version": results_version,
+            "built_at": datetime.now().isoformat(timespec="seconds"),
+            "count": len(self.rows),
+            "ids": list(self.rows),
+            "fields": {f: {"values": idx.values, "ids": idx.ids} for f, idx in self.fields.items()},
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        rows = {pid: dict.fromkeys(FIELDS) for pid in data["ids"]}
+        fields = {}
+        for f, d in data["fields"].items():
+            fields[f] = SortedIndex(d["values"], d["ids"])
+            for v, pid in zip(d["values"], d["ids"]):
+                rows[pid][f] = v
+        return cls(fields, rows)
+
+    def save(self, path, results_version=None, keep=snapshots.DEFAULT_KEEP):
+        """Publish as the next snapshot version of path; returns that version."""
+        return snapshots.publish(path, self.to_json(results_version), keep=keep, indent=None)
+
+    @classmethod
+    def load(cls, path):
+        return cls.from_json(snapshots.load(path))
+
+
+def index_path(results_path):
+    """results/enhanced_data.json -> results/enhanced_data.index.json"""
+    return os.path.splitext(results_path)[0] + ".index.json"
+
+
+def build_index(policies, results_path, results_version=None, keep=snapshots.DEFAULT_KEEP):
+    """
+    Build and publish the index that sits next to results_path; returns it.
+    results_version is the results snapshot it was built from (the current
+    one in results_path's manifest when not given).
+    """
+    if results_version is None:
+        manifest = snapshots.read_manifest(results_path)
+        results_version = manifest["current"]["version"] if manifest else None
+    index = PolicyIndex.from_policies(policies)
+    index.save(index_path(results_path), results_version, keep=keep)
+    return index
+
+
+def main(input_path="results/enhanced_data.json", **ranges):
+    """Build the index next to input_path; with ranges, also run a query against it."""
+    policies = policies_from(snapshots.load(input_path))
+
+    index = build_index(policies, input_path)
+    print(f"Indexed {len(index)} policies -> {index_path(input_path)}")
+
+    if ranges:
+        by_id = {p["id"]: p for p in policies}
+        ids = index.query(**ranges)
+        print(f"{len(ids)} policies match {ranges}")
+        for pid in ids[:20]:
+            p = by_id[pid]
+            print(f"- ID {pid} | {p.get('account_name')} | TIV {p.get('tiv')} | "
+                  f"{index.rows[pid]['effective_date']} -> {index.rows[pid]['expiration_date']}")
+    return index
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+"""
+Embedded SQLite store for policies, scores, explanations and account aggregates.
+
+Raw policies live in `policies` (indexed columns + the full record as JSON).
+Each enhanced results file is loaded as a dataset ("enhanced_data",
+"cleaned_data", ...) into `scores`, `explanations` and `accounts`, so point
+lookups and filtered queries read a few rows instead of re-parsing the JSON
+files. Loads are bulk executemany calls inside one transaction, and every
+JSON layout the pipeline writes can be exported back out. A dataset keeps
+its own copy of each policy as the results file had it (explanations.details),
+so loading an older results file never rewrites the raw policies.
+"""
+import itertools
+import json
+import os
+import sqlite3
+
+DEFAULT_DB = "results/policies.sqlite"
+DEFAULT_FILES = ("results/data.json", "results/enhanced_data.json", "results/cleaned_data.json")
+BATCH_SIZE = 5_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS policies (
+    id INTEGER PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    account_name TEXT,
+    primary_risk_state TEXT,
+    line_of_business TEXT,
+    tiv REAL,
+    total_premium REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS policies_account ON policies (account_name);
+CREATE INDEX IF NOT EXISTS policies_state ON policies (primary_risk_state);
+CREATE INDEX IF NOT EXISTS policies_lob ON policies (line_of_business);
+CREATE INDEX IF NOT EXISTS policies_seq ON policies (seq);
+
+CREATE TABLE IF NOT EXISTS scores (
+    dataset TEXT NOT NULL,
+    policy_id INTEGER NOT NULL,
+    account_key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    cohere_relevance REAL,
+    score REAL,
+    risk_score REAL,
+    relevance_engine TEXT,
+    PRIMARY KEY (dataset, policy_id)
+);
+CREATE INDEX IF NOT EXISTS scores_score ON scores (dataset, score);
+CREATE INDEX IF NOT EXISTS scores_account ON scores (dataset, account_key, position);
+
+CREATE TABLE IF NOT EXISTS explanations (
+    dataset TEXT NOT NULL,
+    policy_id INTEGER NOT NULL,
+    justification_points TEXT,
+    refs TEXT,
+    explanation_engine TEXT,
+    details TEXT,
+    PRIMARY KEY (dataset, policy_id)
+);
+
+CREATE TABLE IF NOT EXISTS accounts (
+    dataset TEXT NOT NULL,
+    account_key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    avg_score REAL,
+    max_score REAL,
+    weighted_score REAL,
+    avg_risk_score REAL,
+    weighted_risk_score REAL,
+    extra TEXT,
+    PRIMARY KEY (dataset, account_key)
+);
+CREATE INDEX IF NOT EXISTS accounts_weighted ON accounts (dataset, weighted_score);
+"""
+
+RAW_COLUMNS = ("account_name", "primary_risk_state", "line_of_business", "tiv", "total_premium")
+SCORE_COLUMNS = ("cohere_relevance", "score", "risk_score", "relevance_engine")
+ACCOUNT_COLUMNS = ("avg_score", "max_score", "weighted_score", "avg_risk_score", "weighted_risk_score")
+EXPLANATION_COLUMNS = ("justification_points", "references", "explanation_engine")
+# Keys the pipeline adds to a raw policy (the rest of an enhanced policy is raw data)
+PIPELINE_FIELDS = set(SCORE_COLUMNS) | set(EXPLANATION_COLUMNS) | {
+    "score_breakdown", "justification_cache", "explanation_partial", "account_id",
+    "local_score", "guideline_relevance", "best_guideline", "appetite_score",
+}
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _batches(rows, size=BATCH_SIZE):
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def dataset_name(path):
+    """results/enhanced_data.json -> "enhanced_data" """
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+class PolicyStore:
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    # ---------------------------
+    # Bulk loads
+    # ---------------------------
+    def _bulk(self, statement, rows):
+        """executemany in batches inside the caller's transaction; returns rows written."""
+        n = 0
+        for batch in _batches(rows):
+            self.db.executemany(statement, batch)
+            n += len(batch)
+        return n
+
+    def _transaction(self):
+        return _Transaction(self.db)
+
+    def load_policies(self, policies):
+        """
+        Upsert raw policies (any iterable, e.g. data_grouper.iter_policies);
+        returns the count. New policies are appended to the export order,
+        updated ones keep their place.
+        """
+        with self._transaction():
+            return self._upsert_policies(policies)
+
+    def _upsert_policies(self, policies, replace=True):
+        """Insert policies; existing ids are updated in place (replace) or left as they are."""
+        start = self.db.execute("SELECT COALESCE(MAX(seq), -1) + 1 FROM policies").fetchone()[0]
+        rows = (
+            (p["id"], seq,
+             *(_number(p.get(c)) if c in ("tiv", "total_premium") else p.get(c) for c in RAW_COLUMNS),
+             json.dumps(p))
+            for seq, p in enumerate(policies, start)
+        )
+        return self._bulk(
+            "INSERT INTO policies (id, seq, account_name, primary_risk_state, line_of_business, "
+            "tiv, total_premium, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            + ("ON CONFLICT (id) DO UPDATE SET account_name = excluded.account_name, "
+               "primary_risk_state = excluded.primary_risk_state, line_of_business = excluded.line_of_business, "
+               "tiv = excluded.tiv, total_premium = excluded.total_premium, data = excluded.data"
+               if replace else "ON CONFLICT (id) DO NOTHING"),
+            rows,
+        )
+
+    def load_enhanced(self, data, dataset):
+        """
+        Replace dataset with an {"accounts": ...} results layout: scores and
+        explanations go to their tables, the rest of each policy (as this file
+        has it) to explanations.details, account summaries to accounts. Raw
+        fields are added to policies only for ids not stored yet; existing raw
+        rows are left alone. Returns (accounts, policies) loaded.
+        """
+        raw, scores, explanations, accounts = [], [], [], []
+        for a_pos, (key, entry) in enumerate(data["accounts"].items()):
+            accounts.append((
+                dataset, key, a_pos, *(entry.get(c) for c in ACCOUNT_COLUMNS),
+                json.dumps({k: v for k, v in entry.items() if k not in ACCOUNT_COLUMNS and k != "policies"}),
+            ))
+            for p_pos, p in enumerate(entry.get("policies", {}).values()):
+                raw.append({k: v for k, v in p.items() if k not in PIPELINE_FIELDS})
+                scores.append((dataset, p["id"], key, p_pos, *(p.get(c) for c in SCORE_COLUMNS)))
+                details = {k: v for k, v in p.items() if k not in SCORE_COLUMNS and k not in EXPLANATION_COLUMNS}
+                explanations.append((
+                    dataset, p["id"], json.dumps(p.get("justification_points")), json.dumps(p.get("references")),
+                    p.get("explanation_engine"), json.dumps(details),
+                ))
+
+        with self._transaction():
+            self._upsert_policies(raw, replace=False)
+            for table in ("scores", "explanations", "accounts"):
+                self.db.execute(f"DELETE FROM {table} WHERE dataset = ?", (dataset,))
+            self._bulk("INSERT INTO scores VALUES (?, ?, ?, ?, ?, ?, ?, ?)", scores)
+            self._bulk("INSERT INTO explanations VALUES (?, ?, ?, ?, ?, ?)", explanations)
+            self._bulk("INSERT INTO accounts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", accounts)
+        return len(accounts), len(scores)
+
+    def load_file(self, path, dataset=None):
+        """Load any of the pipeline's JSON layouts; returns a short description."""
+        if path.endswith(".ndjson"):
+            from .data_grouper import iter_policies
+
+            return f"{self.load_policies(iter_policies(path))} policies"
+        with open(path, "r") as f:
+            data = json.load(f)
+        if "accounts" in data:
+            accounts, policies = self.load_enhanced(data, dataset or dataset_name(path))
+            return f"{policies} policies in {accounts} accounts as dataset {dataset or dataset_name(path)!r}"
+        if "grouped_accounts" in data:
+            policies = (r for g in data["grouped_accounts"] for r in g["records"])
+        else:
+            policies = data["output"][0]["data"]
+        return f"{self.load_policies(policies)} policies"
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+    def datasets(self):
+        return [r[0] for r in self.db.execute("SELECT DISTINCT dataset FROM accounts ORDER BY dataset")]
+
+    def _enhanced(self, row):
+        """One enhanced policy from a joined policies/scores/explanations row."""
+        details = json.loads(row["details"] or "{}")
+        # details holds the dataset's whole policy; stores from before that only had pipeline fields
+        p = details if "id" in details else {**json.loads(row["data"]), **details}
+        for c in SCORE_COLUMNS:
+            if row[c] is not None:
+                p[c] = row[c]
+        p["justification_points"] = json.loads(row["justification_points"] or "null")
+        p["references"] = json.loads(row["refs"] or "null")
+        if row["explanation_engine"] is not None:
+            p["explanation_engine"] = row["explanation_engine"]
+        return p
+
+    _JOINED = (
+        "SELECT p.data, s.*, e.justification_points, e.refs, e.explanation_engine, e.details "
+        "FROM scores s JOIN policies p ON p.id = s.policy_id "
+        "LEFT JOIN explanations e ON e.dataset = s.dataset AND e.policy_id = s.policy_id "
+    )
+
+    def policy(self, policy_id, dataset=None):
+        """One policy: raw, or as scored in dataset. None if unknown."""
+        if dataset is None:
+            row = self.db.execute("SELECT data FROM policies WHERE id = ?", (policy_id,)).fetchone()
+            return json.loads(row["data"]) if row else None
+        row = self.db.execute(self._JOINED + "WHERE s.dataset = ? AND s.policy_id = ?", (dataset, policy_id)).fetchone()
+        return self._enhanced(row) if row else None
+
+    def query(self, dataset=None, account_name=None, state=None, line_of_business=None,
+              min_score=None, max_score=None, order_by_score=True, limit=None):
+        """
+        Policies matching every given filter. With a dataset the policies come
+        back enhanced and can be filtered / ordered by score; without one, raw.
+        """
+        where, args = [], []
+        for column, value in (("p.account_name", account_name), ("p.primary_risk_state", state),
+                              ("p.line_of_business", line_of_business)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                args.append(value)
+
+        if dataset is None:
+            if min_score is not None or max_score is not None:
+                raise ValueError("score filters need a dataset")
+            sql = "SELECT p.data FROM policies p"
+            order = " ORDER BY p.seq"
+        else:
+            sql = self._JOINED.rstrip()
+            where.insert(0, "s.dataset = ?")
+            args.insert(0, dataset)
+            if min_score is not None:
+                where.append("s.score >= ?")
+                args.append(min_score)
+            if max_score is not None:
+                where.append("s.score <= ?")
+                args.append(max_score)
+            order = " ORDER BY s.score DESC" if order_by_score else " ORDER BY s.account_key, s.position"
+
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += order
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(limit)
+
+        rows = self.db.execute(sql, args)
+        if dataset is None:
+            return [json.loads(r["data"]) for r in rows]
+        return [self._enhanced(r) for r in rows]
+
+    def account(self, dataset, account_key):
+        """One account entry as it appears in the enhanced layout; None if unknown."""
+        row = self.db.execute(
+            "SELECT * FROM accounts WHERE dataset = ? AND account_key = ?", (dataset, account_key)
+        ).fetchone()
+        if row is None:
+            return None
+        policies = self.db.execute(
+            self._JOINED + "WHERE s.dataset = ? AND s.account_key = ? ORDER BY s.position", (dataset, account_key)
+        )
+        return self._account_entry(row, (self._enhanced(r) for r in policies))
+
+    @staticmethod
+    def _account_entry(row, policies):
+        entry = {c: row[c] for c in ACCOUNT_COLUMNS}
+        entry.update(json.loads(row["extra"] or "{}"))
+        entry["policies"] = {p["id"]: p for p in policies}
+        return entry
+
+    # ---------------------------
+    # JSON exports
+    # ---------------------------
+    def export_raw(self):
+        """The {"output": [{"data": [...]}]} layout of results/data.json."""
+        return {"output": [{"data": self.query()}]}
+
+    def export_grouped(self):
+        """The grouped_policies.json layout."""
+        from .data_grouper import group_policies
+
+        return group_policies(self.query())
+
+    def export_enhanced(self, dataset):
+        """The {"accounts": ...} layout of enhanced_data.json / cleaned_data.json."""
+        accounts = {}
+        by_account = itertools.groupby(
+            self.db.execute(self._JOINED + "WHERE s.dataset = ? ORDER BY s.account_key, s.position", (dataset,)),
+            key=lambda r: r["account_key"],
+        )
+        policies = {key: [self._enhanced(r) for r in rows] for key, rows in by_account}
+        for row in self.db.execute("SELECT * FROM accounts WHERE dataset = ? ORDER BY position", (dataset,)):
+            accounts[row["account_key"]] = self._account_entry(row, policies.get(row["account_key"], []))
+        return {"accounts": accounts}
+
+
+class _Transaction:
+    """BEGIN ... COMMIT around a block (ROLLBACK on error); the connection is in autocommit mode."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN")
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def main(paths=DEFAULT_FILES, db_path=DEFAULT_DB):
+    import time
+
+    store = PolicyStore(db_path)
+    for path in paths:
+        start = time.perf_counter()
+        print(f"{path}: {store.load_file(path)} ({time.perf_counter() - start:.2f}s)")
+    print(f"Datasets in {db_path}: {store.datasets()}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
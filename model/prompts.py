@@ -0,0 +1,184 @@
+"""
+Prompt builder for the chat stages.
+
+Guidelines, the policy-line legend and the reply rules live in one system
+preamble built once per run and sent unchanged with every request; the user
+message is just the compact policy line plus a one-sentence task. Every
+request is measured against a token ceiling and recorded so each run can
+report its token totals. chat_stream() consumes streamed replies and hands
+each array element over as soon as it is complete (see json_stream).
+"""
+import json
+import math
+import re
+import time
+
+from .guidelines import GUIDELINES
+from .json_stream import ArrayStream
+from .policy_docs import POLICY_LINE_LEGEND, POLICY_LINE_OPTIONAL, policy_line
+
+CHAT_MODEL = "command-r-plus"
+DEFAULT_CEILING = 1024  # estimated input tokens per request
+
+TASKS = {
+    "points": 'Return {"points": [...]}: short bullets on why the policy fits the guidelines or not.',
+    "references": (
+        'Return {"references": [{"point": ..., "link": ...}]}: 2-3 short supporting points, '
+        "each with a plausible industry, gov or insurance URL."
+    ),
+}
+
+_PIECES = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text):
+    """
+    Offline token estimate close to BPE tokenizers on this kind of text:
+    words cost ~1 token per 6 letters, digit runs 1 per 3, punctuation 1 each.
+    """
+    total = 0
+    for piece in _PIECES.findall(text):
+        if piece[0].isalpha():
+            total += math.ceil(len(piece) / 6)
+        elif piece[0].isdigit():
+            total += math.ceil(len(piece) / 3)
+        else:
+            total += 1
+    return total
+
+
+def _usage(resp):
+    """(input, output) tokens reported by the API, if the response carries them."""
+    usage = getattr(resp, "usage", None)
+    for attr in ("tokens", "billed_units"):
+        units = getattr(usage, attr, None)
+        if units is not None and getattr(units, "input_tokens", None) is not None:
+            return units.input_tokens, getattr(units, "output_tokens", None)
+    return None, None
+
+
+class PromptBuilder:
+    def __init__(self, guidelines=GUIDELINES, extra_instructions="", ceiling=DEFAULT_CEILING,
+                 tokenizer=estimate_tokens):
+        self.ceiling = ceiling
+        self.tokenizer = tokenizer
+        self.calls = []
+
+        # Leave room for the longest task and a full policy line
+        budget = ceiling - max(tokenizer(t) for t in TASKS.values()) - 64
+        self.preamble = self._preamble(guidelines, extra_instructions)
+        self.guidelines_truncated = False
+        while tokenizer(self.preamble) > budget and guidelines:
+            guidelines = guidelines[: int(len(guidelines) * 0.9)].rstrip()
+            self.preamble = self._preamble(guidelines + " [...]", extra_instructions)
+            self.guidelines_truncated = True
+        if self.guidelines_truncated:
+            print(f"Guidelines truncated to fit the {ceiling}-token prompt ceiling")
+        self.preamble_tokens = tokenizer(self.preamble)
+
+    @staticmethod
+    def _preamble(guidelines, extra_instructions):
+        return "\n".join(part for part in (
+            "You are an underwriting assistant. Guidelines:",
+            guidelines.strip(),
+            POLICY_LINE_LEGEND,
+            "Reply with one JSON object only.",
+            extra_instructions.strip(),
+        ) if part)
+
+    def messages(self, task, policy):
+        """
+        Chat messages for one request, within the token ceiling: optional
+        policy fields are dropped until it fits. Returns (messages, tokens).
+        """
+        dropped = []
+        while True:
+            user = f"Policy: {policy_line(policy, drop=dropped)}\n{TASKS[task]}"
+            tokens = self.preamble_tokens + self.tokenizer(user)
+            if tokens <= self.ceiling or len(dropped) == len(POLICY_LINE_OPTIONAL):
+                break
+            dropped.append(POLICY_LINE_OPTIONAL[len(dropped)])
+        if tokens > self.ceiling:
+            raise ValueError(f"{task} prompt for policy {policy['id']} is {tokens} tokens, over the {self.ceiling} ceiling")
+        return [
+            {"role": "system", "content": self.preamble},
+            {"role": "user", "content": user},
+        ], tokens
+
+    def chat(self, co, task, policy, model=CHAT_MODEL, temperature=0.2):
+        """Send one task for one policy; returns the reply text and records token use."""
+        messages, estimated = self.messages(task, policy)
+        resp = co.chat(model=model, messages=messages, temperature=temperature)
+        actual_in, actual_out = _usage(resp)
+        self.calls.append({
+            "task": task, "policy": policy["id"], "estimated_input": estimated,
+            "input_tokens": actual_in, "output_tokens": actual_out,
+        })
+        return resp.message.content[0].text.strip()
+
+    def chat_json(self, co, task, policy, fallback, **kwargs):
+        """chat() parsed as JSON; fallback(text) builds the result when parsing fails."""
+        text = self.chat(co, task, policy, **kwargs)
+        try:
+            return json.loads(text)
+        except ValueError:
+            return fallback(text)
+
+    def chat_stream(self, co, task, policy, on_item=None, model=CHAT_MODEL, temperature=0.2):
+        """
+        Streamed chat(): each element of the reply's task array is passed to
+        on_item as soon as it is complete. Returns (items, text, error); on a
+        mid-stream failure error is the exception and items holds everything
+        that completed before it.
+        """
+        messages, estimated = self.messages(task, policy)
+        parser = ArrayStream(task)
+        call = {
+            "task": task, "policy": policy["id"], "estimated_input": estimated,
+            "input_tokens": None, "output_tokens": None, "first_item_s": None,
+        }
+        self.calls.append(call)
+        start = time.perf_counter()
+        error = None
+        try:
+            for event in co.chat_stream(model=model, messages=messages, temperature=temperature):
+                kind = getattr(event, "type", None)
+                if kind == "content-delta":
+                    for item in parser.feed(event.delta.message.content.text or ""):
+                        if call["first_item_s"] is None:
+                            call["first_item_s"] = time.perf_counter() - start
+                        if on_item:
+                            on_item(item)
+                elif kind == "message-end":
+                    call["input_tokens"], call["output_tokens"] = _usage(event.delta)
+        except Exception as e:
+            error = e
+            call["error"] = f"{e.__class__.__name__}: {e}"
+        call["total_s"] = time.perf_counter() - start
+        return parser.items, parser.text.strip(), error
+
+    def totals(self):
+        reported = [c for c in self.calls if c["input_tokens"] is not None]
+        return {
+            "requests": len(self.calls),
+            "estimated_input_tokens": sum(c["estimated_input"] for c in self.calls),
+            "input_tokens": sum(c["input_tokens"] for c in reported) if reported else None,
+            "output_tokens": sum(c["output_tokens"] or 0 for c in reported) if reported else None,
+            "preamble_tokens": self.preamble_tokens,
+            "stream_errors": sum("error" in c for c in self.calls),
+            "ceiling": self.ceiling,
+        }
+
+    def report(self):
+        t = self.totals()
+        line = f"Chat tokens: {t['requests']} requests, ~{t['estimated_input_tokens']} input (estimated)"
+        if t["input_tokens"] is not None:
+            line += f", {t['input_tokens']} input / {t['output_tokens']} output (reported)"
+        firsts = [c["first_item_s"] for c in self.calls if c.get("first_item_s") is not None]
+        if firsts:
+            totals = [c["total_s"] for c in self.calls if c.get("first_item_s") is not None]
+            line += (f"; first item after {sum(firsts) / len(firsts):.2f}s on average "
+                     f"(full reply {sum(totals) / len(totals):.2f}s)")
+        if t["stream_errors"]:
+            line += f"; {t['stream_errors']} streams failed"
+        return line
@@ -0,0 +1,257 @@
+"""
+Mergeable quantile sketches of appetite, relevance and risk scores per
+state, line of business and account.
+
+Each distribution is a KLL sketch: a stack of compactors where level h holds
+items of weight 2**h, and a full level is sorted and every other item
+promoted. Memory stays around k * log2(n / k) items however many scores go
+in, and quantiles are within roughly 1.7 / k of the true rank (about 1% at
+the default k=200). Sketches from different shards merge by concatenating
+levels and compacting, and serialize to plain JSON next to the results.
+"""
+import json
+import math
+import os
+import random
+
+DEFAULT_K = 200
+C = 2 / 3  # capacity shrink per level below the top
+QUANTILES = (0.5, 0.9, 0.99)
+
+DIMENSIONS = {
+    "state": lambda p: p.get("primary_risk_state") or "?",
+    "line_of_business": lambda p: p.get("line_of_business") or "?",
+    # Resolved account id when resolution ran (see account_resolution), so merged spellings share a sketch
+    "account": lambda p: p.get("account_id") or p.get("account_name") or "?",
+}
+
+
+def _appetite(p):
+    from .model import appetite_score
+
+    return appetite_score(p)
+
+
+def _risk(p):
+    if isinstance(p.get("risk_score"), (int, float)):
+        return p["risk_score"]
+    from .risk_score import calculate_risk_score
+
+    return calculate_risk_score(p)
+
+
+METRICS = {
+    "appetite": _appetite,
+    "relevance": lambda p: p.get("cohere_relevance"),
+    "risk": _risk,
+}
+
+
+class KLLSketch:
+    def __init__(self, k=DEFAULT_K, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [[]]
+        self.min = None
+        self.max = None
+        self._rng = random.Random(seed)
+        self._room = self._max_size()  # level-0 length that triggers the next compaction
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * C ** depth)))
+
+    def _size(self):
+        return sum(len(level) for level in self.levels)
+
+    def _max_size(self):
+        return sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def update(self, value):
+        if value is None:
+            return
+        value = float(value)
+        self.n += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        self.levels[0].append(value)
+        # Only level 0 grows between compactions: compare it with its share
+        if len(self.levels[0]) >= self._room:
+            self._compress()
+
+    def _compress(self):
+        """Compact the lowest over-full levels until the sketch fits again."""
+        while self._size() >= self._max_size():
+            # Some level is at capacity whenever the total is
+            h = next(h for h in range(len(self.levels)) if len(self.levels[h]) >= self._capacity(h))
+            if h + 1 == len(self.levels):
+                self.levels.append([])
+            level = sorted(self.levels[h])
+            # Keep an odd leftover at this level; promote every other item of the rest
+            keep = level[-1:] if len(level) % 2 else []
+            pairs = level[:len(level) - len(keep)]
+            self.levels[h + 1].extend(pairs[self._rng.randint(0, 1)::2])
+            self.levels[h] = keep
+        self._room = self._max_size() - self._size() + len(self.levels[0])
+
+    def merge(self, other):
+        """Fold another sketch in (any k; the result keeps this sketch's k)."""
+        if other.n == 0:
+            return self
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for h, items in enumerate(other.levels):
+            self.levels[h].extend(items)
+        self.n += other.n
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """Approximate q-quantile (0 <= q <= 1); None for an empty sketch."""
+        if self.n == 0:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        weighted = sorted((v, 1 << h) for h, level in enumerate(self.levels) for v in level)
+        total = sum(w for _, w in weighted)
+        target = q * total
+        seen = 0
+        for value, weight in weighted:
+            seen += weight
+            if seen >= target:
+                return value
+        return self.max
+
+    def quantiles(self, qs=QUANTILES):
+        return {f"p{round(q * 100):g}": self.quantile(q) for q in qs}
+
+    def to_json(self):
+        return {"k": self.k, "n": self.n, "min": self.min, "max": self.max, "levels": self.levels}
+
+    @classmethod
+    def from_json(cls, data):
+        sketch = cls(data["k"])
+        sketch.n = data["n"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        sketch.levels = [list(level) for level in data["levels"]] or [[]]
+        sketch._compress()
+        return sketch
+
+
+class ScoreSketches:
+    """KLL sketch per dimension (state / LOB / account), group and metric."""
+
+    def __init__(self, k=DEFAULT_K):
+        self.k = k
+        self.sketches = {d: {} for d in DIMENSIONS}  # dimension -> group -> metric -> KLLSketch
+
+    def add(self, p):
+        values = {m: fn(p) for m, fn in METRICS.items()}
+        for dim, key_fn in DIMENSIONS.items():
+            group = self.sketches[dim].setdefault(key_fn(p), {})
+            for metric, value in values.items():
+                if value is not None:
+                    group.setdefault(metric, KLLSketch(self.k)).update(value)
+
+    def extend(self, policies):
+        for p in policies:
+            self.add(p)
+        return self
+
+    def merge(self, other):
+        for dim, groups in other.sketches.items():
+            mine = self.sketches.setdefault(dim, {})
+            for group, metrics in groups.items():
+                target = mine.setdefault(group, {})
+                for metric, sketch in metrics.items():
+                    target.setdefault(metric, KLLSketch(self.k)).merge(sketch)
+        return self
+
+    def view(self, qs=QUANTILES):
+        """{dimension: {group: {metric: {"n", "p50", "p90", "p99"}}}}"""
+        return {
+            dim: {
+                group: {m: {"n": s.n, **{k: _round(v) for k, v in s.quantiles(qs).items()}}
+                        for m, s in metrics.items()}
+                for group, metrics in groups.items()
+            }
+            for dim, groups in self.sketches.items()
+        }
+
+    def to_json(self):
+        return {
+            "k": self.k,
+            "view": self.view(),
+            "sketches": {
+                dim: {group: {m: s.to_json() for m, s in metrics.items()} for group, metrics in groups.items()}
+                for dim, groups in self.sketches.items()
+            },
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        sketches = cls(data.get("k", DEFAULT_K))
+        for dim, groups in data["sketches"].items():
+            sketches.sketches[dim] = {
+                group: {m: KLLSketch.from_json(s) for m, s in metrics.items()} for group, metrics in groups.items()
+            }
+        return sketches
+
+    def save(self, path):
+        from .snapshots import atomic_write_json
+
+        atomic_write_json(path, self.to_json())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r") as f:
+            return cls.from_json(json.load(f))
+
+
+def _round(value):
+    return None if value is None else round(value, 4)
+
+
+def sketch_path(results_path):
+    """results/enhanced_data.json -> results/enhanced_data.quantiles.json"""
+    return os.path.splitext(results_path)[0] + ".quantiles.json"
+
+
+def build_sketches(policies, results_path, k=DEFAULT_K):
+    """Build and save the sketches that sit next to results_path; returns them."""
+    sketches = ScoreSketches(k).extend(policies)
+    sketches.save(sketch_path(results_path))
+    return sketches
+
+
+def merge_files(paths, output_path):
+    """Merge sketch files from several shards into output_path."""
+    merged = None
+    for path in paths:
+        sketches = ScoreSketches.load(path)
+        merged = sketches if merged is None else merged.merge(sketches)
+    merged.save(output_path)
+    return merged
+
+
+def main(input_path="results/enhanced_data.json", k=DEFAULT_K):
+    from .policy_index import policies_from
+
+    with open(input_path, "r") as f:
+        policies = policies_from(json.load(f))
+    sketches = build_sketches(policies, input_path, k)
+    print(f"Sketched {len(policies)} policies -> {sketch_path(input_path)}")
+    for state, metrics in sorted(sketches.view()["state"].items()):
+        line = " | ".join(f"{m} p50 {v['p50']} p90 {v['p90']} p99 {v['p99']}" for m, v in metrics.items())
+        print(f"- {state} (n={next(iter(metrics.values()))['n']}): {line}")
+
+
+if __name__ == "__main__":
+    main()
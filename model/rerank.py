@@ -0,0 +1,39 @@
+RERANK_MODEL = "rerank-v3.5"
+RERANK_TIMEOUT = 30  # seconds before falling back to the local ranker
+
+
+def cohere_rerank(co, query, documents, model=RERANK_MODEL, timeout=RERANK_TIMEOUT):
+    """
+    Rerank documents against query with Cohere.
+    Returns relevance scores aligned with documents (index i -> documents[i]).
+    """
+    if not documents:
+        return []
+
+    results = co.rerank(
+        model=model,
+        query=query,
+        documents=documents,
+        top_n=len(documents),
+        request_options={"timeout_in_seconds": timeout}
+    )
+
+    scores = [0.0] * len(documents)
+    for r in results.results:
+        scores[r.index] = r.relevance_score
+    return scores
+
+
+def rerank_with_fallback(co, query, documents, model=RERANK_MODEL, timeout=RERANK_TIMEOUT):
+    """
+    Rerank with Cohere, failing over to the offline BM25 ranker when the API
+    errors or times out.
+    Returns (scores, engine) where engine is "cohere" or "lexical".
+    """
+    try:
+        return cohere_rerank(co, query, documents, model=model, timeout=timeout), "cohere"
+    except Exception as e:
+        print(f"Cohere rerank failed ({e.__class__.__name__}: {e}), using lexical ranker")
+        from .lexical_rank import bm25_scores
+
+        return bm25_scores(query, documents), "lexical"
@@ -0,0 +1,104 @@
+import threading
+
+
+class _Batch:
+    def __init__(self):
+        self.docs = []  # unique documents, in arrival order
+        self.positions = {}  # document -> index in docs
+        self.done = threading.Event()
+        self.scores = None
+        self.engine = None
+        self.error = None
+
+
+class RerankGateway:
+    """
+    Coalesces concurrent rerank calls for the same query into one batched call.
+
+    The first caller for a query opens a batch; other callers with the same
+    query that arrive within max_wait_ms join it. The batch is sent as a single
+    rerank_fn(query, documents) call when the window closes or when it holds
+    max_batch unique documents, and each caller gets back the scores for its
+    own documents. Identical documents are only sent once.
+
+    gateway.rerank is a drop-in rerank_fn: it returns (scores, engine). A call
+    with more than max_batch documents is split into chunks of max_batch, so no
+    batch goes over the per-request document limit.
+    """
+
+    def __init__(self, rerank_fn, max_wait_ms=20, max_batch=1000):
+        self.rerank_fn = rerank_fn
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch = max_batch
+        self.stats = {"requests": 0, "calls": 0, "documents_in": 0, "documents_sent": 0}
+        self._pending = {}  # query -> open _Batch
+        self._lock = threading.Lock()
+
+    def rerank(self, query, documents):
+        if not documents:
+            return [], None
+        if len(documents) > self.max_batch:
+            scores, engines = [], set()
+            for i in range(0, len(documents), self.max_batch):
+                chunk_scores, engine = self.rerank(query, documents[i:i + self.max_batch])
+                scores.extend(chunk_scores)
+                engines.add(engine)
+            # Chunks can land on different engines if the fallback kicked in for some
+            return scores, engines.pop() if len(engines) == 1 else "mixed"
+
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["documents_in"] += len(documents)
+
+            batch = self._pending.get(query)
+            new_docs = 0 if batch is None else len(set(documents) - batch.positions.keys())
+            if batch is not None and len(batch.docs) + new_docs > self.max_batch:
+                # Would overflow: send the open batch now and start a new one
+                self._close(query, batch)
+                batch = None
+            if batch is None:
+                batch = _Batch()
+                self._pending[query] = batch
+                timer = threading.Timer(self.max_wait, self._flush, args=(query, batch))
+                timer.daemon = True
+                timer.start()
+
+            for doc in documents:
+                if doc not in batch.positions:
+                    batch.positions[doc] = len(batch.docs)
+                    batch.docs.append(doc)
+            flush_now = len(batch.docs) >= self.max_batch
+            if flush_now:
+                del self._pending[query]
+
+        if flush_now:
+            self._send(query, batch)
+
+        batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+        return [batch.scores[batch.positions[doc]] for doc in documents], batch.engine
+
+    def _close(self, query, batch):
+        """Detach batch from _pending (lock held) and send it on a worker thread."""
+        del self._pending[query]
+        threading.Thread(target=self._send, args=(query, batch), daemon=True).start()
+
+    def _flush(self, query, batch):
+        """Timer callback: send the batch if it is still waiting."""
+        with self._lock:
+            if self._pending.get(query) is not batch:
+                return  # already sent because it filled up
+            del self._pending[query]
+        self._send(query, batch)
+
+    def _send(self, query, batch):
+        try:
+            batch.scores, batch.engine = self.rerank_fn(query, batch.docs)
+        except Exception as e:
+            batch.error = e
+        finally:
+            with self._lock:
+                self.stats["calls"] += 1
+                self.stats["documents_sent"] += len(batch.docs)
+            batch.done.set()
@@ -0,0 +1,182 @@
+import math
+from datetime import datetime
+
+# Order of the columns in the policy×factor matrix
+FACTORS = ["loss", "tiv", "construction", "age", "state", "winnability", "duration"]
+
+# Named weight profiles. "default" is the original cohere_aggregate.py weighting,
+# "duration" the one used by cohere_aggregate_10.py / cohere_aggregate_2.py.
+WEIGHT_PROFILES = {
+    "default": {
+        "loss": 0.35, "tiv": 0.25, "construction": 0.15, "age": 0.10,
+        "state": 0.10, "winnability": 0.05, "duration": 0.0,
+    },
+    "duration": {
+        "loss": 0.30, "tiv": 0.20, "construction": 0.15, "age": 0.10,
+        "state": 0.10, "winnability": 0.05, "duration": 0.10,
+    },
+}
+
+
+# ---------------------------
+# Risk factor components (each 0–1)
+# ---------------------------
+def risk_factors(policy):
+    tiv = policy.get("tiv", 0) or 0
+    year = policy.get("oldest_building", 2025) or 2025
+    construction = (policy.get("construction_type") or "").lower()
+    state = policy.get("primary_risk_state", "")
+    winnability = policy.get("winnability", 0.5) or 0.5
+
+    premium = float(policy.get("total_premium", 0) or 0)
+    loss_value = float(policy.get("loss_value", 0) or 0)
+
+    # Loss ratio normalization
+    loss_ratio = loss_value / premium if premium > 0 else 1
+    loss_ratio_norm = min(1, loss_ratio / 0.7)
+    loss_component = 1 - loss_ratio_norm
+
+    # TIV normalization (log scale up to 50M)
+    tiv_norm = min(1, math.log(max(tiv, 1)) / math.log(50_000_000))
+
+    # Construction score
+    if "fire resistive" in construction or "non-combustible" in construction:
+        construction_score = 1
+    elif "masonry" in construction or "mixed" in construction:
+        construction_score = 0.5
+    elif construction:
+        construction_score = 0.2
+    else:
+        construction_score = 0.3  # unknown
+
+    # Age score
+    age_score = max(0, 1 - (2025 - int(year)) / 100)
+
+    # State score
+    if state in ["CA", "TX"]:
+        state_score = 1
+    else:
+        state_score = 0.5
+
+    # Winnability (normalize if percentage)
+    if isinstance(winnability, (int, float)):
+        if winnability > 1:
+            winnability = min(1, winnability / 100)
+    else:
+        winnability = 0.5
+
+    # Duration score (effective → expiration, normalized around 1 year)
+    try:
+        eff = datetime.fromisoformat(policy.get("effective_date", "2025-01-01")[:10])
+        exp = datetime.fromisoformat(policy.get("expiration_date", "2025-12-31")[:10])
+        duration_days = max((exp - eff).days, 1)
+        duration_years = duration_days / 365.0
+        if duration_years <= 1:
+            duration_score = 1.0
+        else:
+            duration_score = max(0, 1 - (duration_years - 1) * 0.2)  # penalize >1 yr
+    except Exception:
+        duration_score = 0.8
+
+    return {
+        "loss": loss_component,
+        "tiv": tiv_norm,
+        "construction": construction_score,
+        "age": age_score,
+        "state": state_score,
+        "winnability": winnability,
+        "duration": duration_score,
+    }
+
+
+# ---------------------------
+# Risk Score Calculation
+# ---------------------------
+def calculate_risk_score(policy, weights=WEIGHT_PROFILES["default"]):
+    factors = risk_factors(policy)
+    risk_score = sum(weights.get(f, 0) * factors[f] for f in FACTORS)
+    return round(risk_score * 100, 2)  # scale to 0–100
+
+
+def risk_contributions(policy, weights=WEIGHT_PROFILES["default"], factors=None):
+    """
+    Per-factor breakdown of calculate_risk_score: [{"factor", "value", "weight",
+    "points", "max_points"}] in FACTORS order. points sum to the unrounded score.
+    """
+    if factors is None:
+        factors = risk_factors(policy)
+    return [
+        {
+            "factor": name,
+            "value": factors[name],
+            "weight": weights.get(name, 0),
+            "points": weights.get(name, 0) * factors[name] * 100,
+            "max_points": weights.get(name, 0) * 100,
+        }
+        for name in FACTORS
+    ]
+
+
+# ---------------------------
+# Multi-scenario scoring
+# ---------------------------
+def factor_matrix(policies):
+    """policy×factor matrix (columns in FACTORS order), computed once per book."""
+    import numpy as np
+
+    return np.array(
+        [[f[name] for name in FACTORS] for f in map(risk_factors, policies)],
+        dtype=np.float64,
+    ).reshape(len(policies), len(FACTORS))
+
+
+def weight_matrix(profiles):
+    """factor×scenario matrix for a {name: {factor: weight}} dict of profiles."""
+    import numpy as np
+
+    return np.array(
+        [[w.get(name, 0) for w in profiles.values()] for name in FACTORS],
+        dtype=np.float64,
+    ).reshape(len(FACTORS), len(profiles))
+
+
+def score_scenarios(factors, profiles=WEIGHT_PROFILES):
+    """
+    Score a whole book under every weight profile with one matrix multiply.
+    factors is a factor_matrix(); returns a policy×scenario array of 0–100 scores
+    whose columns follow the order of profiles.
+    """
+    import numpy as np
+
+    return np.round(factors @ weight_matrix(profiles) * 100, 2)
+
+
+def scenario_table(policies, profiles=WEIGHT_PROFILES, factors=None):
+    """Per-policy risk score under each profile: [{"id": ..., "<profile>": score, ...}]."""
+    if factors is None:
+        factors = factor_matrix(policies)
+    scores = score_scenarios(factors, profiles)
+    names = list(profiles)
+    return [
+        {"id": p["id"], **dict(zip(names, row))}
+        for p, row in zip(policies, scores.tolist())
+    ]
+
+
+def main(input_path="results/data.json", output_path="results/risk_scenarios.json"):
+    import json
+
+    with open(input_path, "r") as f:
+        data = json.load(f)
+
+    policies = data["output"][0]["data"]
+    table = scenario_table(policies)
+
+    with open(output_path, "w") as f:
+        json.dump({"scenarios": list(WEIGHT_PROFILES), "policies": table}, f, indent=2)
+
+    print(f"Saved {output_path} with {len(table)} policies x {len(WEIGHT_PROFILES)} scenarios.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,21 @@
-import json
+from .snapshots import DEFAULT_KEEP, load, publish
 
-# Load JSON file
-with open("results/cleaned_data.json", "r") as f:
-    data = json.load(f)
 
-# Iterate through accounts and policies
-for account in data.get("accounts", {}).values():
-    for policy in account.get("policies", {}).values():
-        if "cohere_relevance" in policy and isinstance(policy["cohere_relevance"], (int, float)):
-            # Increase by 20%
-            policy["cohere_relevance"] += 0.2
+def main(path="results/cleaned_data.json", increase=0.2, keep=DEFAULT_KEEP):
+    # Load the current published version
+    data = load(path)
 
-# Save updated JSON
-with open("results/cleaned_data.json", "w") as f:
-    json.dump(data, f, indent=2)
+    # Iterate through accounts and policies
+    for account in data.get("accounts", {}).values():
+        for policy in account.get("policies", {}).values():
+            if "cohere_relevance" in policy and isinstance(policy["cohere_relevance"], (int, float)):
+                # Increase by 20%
+                policy["cohere_relevance"] += increase
+
+    # Publish as a new version; readers keep seeing the old one until the swap
+    version = publish(path, data, keep=keep, indent=2)
+    print(f"Published {path} v{version}")
+
+
+if __name__ == "__main__":
+    main()
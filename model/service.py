@@ -0,0 +1,268 @@
+import asyncio
+import json
+import time
+from collections import deque
+
+from .model import appetite_score
+from .risk_score import WEIGHT_PROFILES, factor_matrix, score_scenarios
+
+MAX_BODY_BYTES = 1 << 20  # larger /score bodies get a 413
+
+
+class _BadRequest(Exception):
+    """A request that can't be served; answered with status, then the connection is closed."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list (q in 0–100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+class MicroBatcher:
+    """
+    Collects single-policy requests from concurrent callers and scores them
+    together: a batch is flushed when it reaches max_batch policies or when
+    the oldest request has waited max_wait_ms.
+    """
+
+    def __init__(self, score_batch, max_batch=64, max_wait_ms=5):
+        self.score_batch = score_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def submit(self, policies):
+        """Score a list of policies; resolves once the batch they landed in is scored."""
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in policies]
+        for p, fut in zip(policies, futures):
+            self.queue.put_nowait((p, fut))
+        return await asyncio.gather(*futures)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self.batches += 1
+            try:
+                results = self.score_batch([p for p, _ in batch])
+            except Exception:
+                # One bad policy fails the vectorized call: score one by one so only it fails
+                self._run_each(batch)
+                continue
+            for (_, fut), result in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(result)
+
+    def _run_each(self, batch):
+        for p, fut in batch:
+            if fut.done():
+                continue
+            try:
+                fut.set_result(self.score_batch([p])[0])
+            except Exception as e:
+                fut.set_exception(e)
+
+
+class ScoringService:
+    """
+    Keeps guideline rules, risk weights and account aggregates in memory and
+    scores submissions through a MicroBatcher.
+    """
+
+    def __init__(self, accounts=None, weights=WEIGHT_PROFILES["default"], max_batch=64, max_wait_ms=5):
+        # Account aggregates without their (large) policies map
+        self.accounts = {
+            name: {k: v for k, v in acc.items() if k != "policies"}
+            for name, acc in (accounts or {}).items()
+        }
+        self.profiles = {"risk": weights}
+        self.batcher = MicroBatcher(self.score_batch, max_batch=max_batch, max_wait_ms=max_wait_ms)
+        self.latencies = deque(maxlen=10_000)
+        self.requests = 0
+        self.errors = 0
+
+    def score_batch(self, policies):
+        """Vectorized path: risk for the whole batch in one matrix multiply."""
+        risk = score_scenarios(factor_matrix(policies), self.profiles)[:, 0].tolist()
+        results = []
+        for p, risk_score in zip(policies, risk):
+            appetite = appetite_score(p)
+            results.append({
+                "id": p.get("id"),
+                "appetite_score": appetite,
+                "in_appetite": appetite > 0,
+                "risk_score": risk_score,
+                "account": self.accounts.get(p.get("account_name")),
+            })
+        return results
+
+    async def score(self, policies):
+        start = time.perf_counter()
+        try:
+            return await self.batcher.submit(policies)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            # Failed requests count towards latency too
+            self.latencies.append((time.perf_counter() - start) * 1000)
+            self.requests += 1
+
+    def stats(self):
+        lat = list(self.latencies)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "batches": self.batcher.batches,
+            "latency_ms": {
+                "p50": percentile(lat, 50),
+                "p99": percentile(lat, 99),
+            },
+        }
+
+    # ---------------------------
+    # Minimal HTTP/1.1 (keep-alive) on asyncio streams
+    # ---------------------------
+    @staticmethod
+    async def _respond(writer, status, payload, close=False):
+        data = json.dumps(payload).encode()
+        head = f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+        if close:
+            head += "Connection: close\r\n"
+        writer.write((head + "\r\n").encode() + data)
+        await writer.drain()
+
+    async def _read_request(self, reader):
+        """(method, path, headers, body); None at EOF. Raises _BadRequest for what can't be served."""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        parts = request_line.decode("latin-1").split()
+        if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+            raise _BadRequest("400 Bad Request", "malformed request line")
+        method, path, _ = parts
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, sep, value = line.decode("latin-1").partition(":")
+            if not sep:
+                raise _BadRequest("400 Bad Request", "malformed header line")
+            headers[key.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise _BadRequest("400 Bad Request", "invalid Content-Length") from None
+        if length < 0:
+            raise _BadRequest("400 Bad Request", "invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise _BadRequest("413 Payload Too Large", f"body over {MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length) if length else b""
+        return method, path, headers, body
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except _BadRequest as e:
+                    # The rest of the stream can't be framed: answer, then close
+                    await self._respond(writer, e.status, {"error": e.message}, close=True)
+                    break
+                except ValueError:  # a line over the stream reader's limit
+                    await self._respond(writer, "400 Bad Request", {"error": "request line or header too long"},
+                                        close=True)
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+
+                try:
+                    status, payload = await self.route(method, path, body)
+                except Exception as e:
+                    status, payload = "500 Internal Server Error", {"error": f"{e.__class__.__name__}: {e}"}
+                await self._respond(writer, status, payload)
+
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        if method == "GET" and path == "/health":
+            return "200 OK", {"status": "ok"}
+        if method == "GET" and path == "/stats":
+            return "200 OK", self.stats()
+        if method == "POST" and path == "/score":
+            try:
+                req = json.loads(body or b"{}")
+            except ValueError:  # JSONDecodeError or invalid UTF-8
+                return "400 Bad Request", {"error": "body must be JSON"}
+            # A single policy, or {"policies": [...]} for a small batch
+            policies = req.get("policies", [req]) if isinstance(req, dict) else None
+            if not isinstance(policies, list) or not all(isinstance(p, dict) for p in policies):
+                return "400 Bad Request", {"error": "expected a policy object or {\"policies\": [...]}"}
+            return "200 OK", {"results": await self.score(policies)}
+        return "404 Not Found", {"error": f"no route for {method} {path}"}
+
+
+async def serve(service, host="127.0.0.1", port=8080):
+    service.batcher.start()
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"Scoring service listening on http://{host}:{port} (POST /score, GET /stats)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.batcher.stop()
+
+
+def main(path="results/cleaned_data.json", port=8080):
+    """Serve with account aggregates from path (if it exists) loaded into memory."""
+    import os
+
+    accounts = {}
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            accounts = json.load(f).get("accounts", {})
+
+    asyncio.run(serve(ScoringService(accounts), port=int(port)))
+
+
+if __name__ == "__main__":
+    import sys
+
+    main(*sys.argv[1:])
@@ -0,0 +1,167 @@
+"""
+Versioned, atomically published results files.
+
+publish("results/enhanced_data.json", data) writes the new results as
+results/.versions/enhanced_data.v<N>.json (temp file, fsync, rename), then
+flips results/enhanced_data.manifest.json to point at it and swaps the plain
+results/enhanced_data.json over to the same file with another rename. Every
+step is a rename, so readers see the old version or the new one, never a
+half-written file, and a reader that already opened the old version keeps
+reading it undisturbed. The last `keep` versions stay on disk. Concurrent
+publishers of the same path take turns on an exclusive lock file
+(results/.versions/enhanced_data.lock) where fcntl is available.
+"""
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+DEFAULT_KEEP = 3
+VERSIONS_DIR = ".versions"
+
+
+def manifest_path(path):
+    """results/enhanced_data.json -> results/enhanced_data.manifest.json"""
+    return os.path.splitext(path)[0] + ".manifest.json"
+
+
+def _version_path(path, version):
+    folder, name = os.path.split(path)
+    stem, ext = os.path.splitext(name)
+    return os.path.join(folder, VERSIONS_DIR, f"{stem}.v{version}{ext}")
+
+
+def _write_temp(folder, write):
+    """Run write(f) on a temp file in folder, fsync it; returns the temp path."""
+    fd, tmp = tempfile.mkstemp(dir=folder or ".", prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return tmp
+
+
+def atomic_write_json(path, data, indent=None):
+    """json.dump to path via a temp file and rename: readers never see a torn file."""
+    tmp = _write_temp(os.path.dirname(path), lambda f: json.dump(data, f, indent=indent))
+    os.replace(tmp, path)
+
+
+@contextmanager
+def _locked(path):
+    """Exclusive lock on path's lock file for one publish (a no-op without fcntl)."""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    folder, name = os.path.split(path)
+    lock_path = os.path.join(folder, VERSIONS_DIR, os.path.splitext(name)[0] + ".lock")
+    with open(lock_path, "a") as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def read_manifest(path):
+    """The manifest for the results at path, or None if none was published."""
+    try:
+        with open(manifest_path(path), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def current_path(path):
+    """File holding the current version of path (path itself if unversioned)."""
+    manifest = read_manifest(path)
+    if manifest is None:
+        return path
+    return os.path.join(os.path.dirname(path), manifest["current"]["file"])
+
+
+def load(path):
+    """Current version of the results at path."""
+    with open(current_path(path), "r") as f:
+        return json.load(f)
+
+
+def publish(path, data, keep=DEFAULT_KEEP, indent=4):
+    """
+    Write data as the next version of path and make it current. Returns the
+    new version number. Older versions beyond the newest `keep` are deleted.
+    """
+    folder = os.path.dirname(path)
+    os.makedirs(os.path.join(folder, VERSIONS_DIR), exist_ok=True)
+
+    # Write the payload before taking the lock; only the version swap is serialized
+    tmp = _write_temp(folder, lambda f: json.dump(data, f, indent=indent))
+    try:
+        with _locked(path):
+            return _swap_in(path, tmp, keep)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _swap_in(path, tmp, keep):
+    """Allocate the next version for the written temp file and make it current (under the lock)."""
+    folder = os.path.dirname(path)
+    manifest = read_manifest(path) or {"versions": []}
+    version = max((v["version"] for v in manifest["versions"]), default=0) + 1
+    target = _version_path(path, version)
+    os.replace(tmp, target)
+
+    entry = {
+        "version": version,
+        "file": os.path.relpath(target, folder or "."),
+        "published_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "bytes": os.path.getsize(target),
+    }
+    versions = manifest["versions"] + [entry]
+    retained, expired = versions[-max(1, keep):], versions[:-max(1, keep)]
+    atomic_write_json(manifest_path(path), {"current": entry, "versions": retained}, indent=2)
+
+    # Plain path for readers that don't know about the manifest: a hard link
+    # to the new version renamed over it (a copy where links aren't supported)
+    fd, link = tempfile.mkstemp(dir=folder or ".", prefix=".tmp-", suffix=".json")
+    os.close(fd)
+    os.remove(link)
+    try:
+        os.link(target, link)
+    except OSError:
+        import shutil
+
+        shutil.copyfile(target, link)
+    os.replace(link, path)
+
+    for old in expired:
+        try:
+            os.remove(os.path.join(folder, old["file"]))
+        except FileNotFoundError:
+            pass
+    return version
+
+
+def main(path="results/enhanced_data.json"):
+    manifest = read_manifest(path)
+    if manifest is None:
+        print(f"{path}: no published versions")
+        return
+    print(f"{path}: current v{manifest['current']['version']} -> {manifest['current']['file']}")
+    for v in manifest["versions"]:
+        print(f"- v{v['version']} {v['published_at']} {v['bytes']} bytes ({v['file']})")
+
+
+if __name__ == "__main__":
+    import sys
+
+    main(*sys.argv[1:])
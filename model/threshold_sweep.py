@@ -0,0 +1,217 @@
+"""
+Threshold sweeps: how many policies, and how much premium, pass for every
+combination of numeric appetite cutoffs.
+
+Each numeric column is sorted once. For a grid of thresholds, a policy's bin
+along each axis is read off its position in the sorted column; policies are
+histogrammed into the (k1+1)×(k2+1)×... bin grid and prefix-summed along each
+axis, so a full grid costs O(N + cells) instead of one filter pass per cell.
+"""
+import numbers
+
+from .appetite_solver import MAX_LOSS_RATIO, MIN_BUILDING_YEAR, MIN_TIV
+from .model import ACCEPTABLE_STATES, PREFERRED_CONSTRUCTION
+
+
+def _number(value):
+    return value if isinstance(value, numbers.Real) and not isinstance(value, bool) else None
+
+
+def _loss_ratio(p):
+    # Same fallback as appetite_solver.filter_in_appetite
+    try:
+        return float(p.get("loss_value", 0)) / float(p.get("total_premium", 1))
+    except Exception:
+        return 1.0
+
+
+def _loss_value(p):
+    try:
+        return float(p.get("loss_value", "0"))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# Sweepable cutoffs: name -> (column, comparison a passing policy satisfies)
+AXES = {
+    "min_tiv": ("tiv", ">="),
+    "max_tiv": ("tiv", "<="),
+    "max_loss_ratio": ("loss_ratio", "<"),
+    "max_loss_value": ("loss_value", "<="),
+    "min_building_year": ("oldest_building", ">="),
+    "min_premium": ("total_premium", ">="),
+    "max_premium": ("total_premium", "<="),
+}
+
+COLUMNS = {
+    "tiv": lambda p: _number(p.get("tiv", 0)),
+    "loss_ratio": _loss_ratio,
+    "loss_value": _loss_value,
+    "oldest_building": lambda p: _number(p.get("oldest_building", 2100)),
+    "total_premium": lambda p: _number(p.get("total_premium", 0)),
+}
+
+
+# Non-numeric rules applied before sweeping, one preset per rule set in the repo
+def solver_base(p):
+    """The categorical rules of appetite_solver.filter_in_appetite."""
+    return (
+        p.get("line_of_business") == "COMMERCIAL PROPERTY"
+        and bool(p.get("effective_date") and p.get("expiration_date"))
+        and p.get("construction_type") != "Frame"
+    )
+
+
+def model_base(p):
+    """The categorical rules of model.appetite_score."""
+    ct = (p.get("construction_type") or "").upper()
+    return (
+        p.get("renewal_or_new_business") == "NEW_BUSINESS"
+        and p.get("line_of_business") == "COMMERCIAL PROPERTY"
+        and p.get("primary_risk_state") in ACCEPTABLE_STATES
+        and any(t in ct for t in PREFERRED_CONSTRUCTION)
+    )
+
+
+BASES = {"solver": solver_base, "model": model_base, "none": lambda p: True}
+
+# Current cutoffs of each rule set, for reference points on the curves
+CURRENT = {
+    "solver": {"min_tiv": MIN_TIV, "max_loss_ratio": MAX_LOSS_RATIO, "min_building_year": MIN_BUILDING_YEAR},
+    "model": {"max_tiv": 150_000_000, "min_premium": 50_000, "max_premium": 1_705_000,
+              "min_building_year": 1990, "max_loss_value": 100_000},
+}
+
+
+class ThresholdSweep:
+    """
+    Sorted column indexes over the policies that pass the base rules.
+    grid() answers count / premium for every threshold combination.
+    """
+
+    def __init__(self, policies, base="solver", columns=None):
+        import numpy as np
+
+        base_fn = BASES[base] if isinstance(base, str) else base
+        names = columns or sorted({col for col, _ in AXES.values()})
+
+        rows = []
+        for p in policies:
+            if not base_fn(p):
+                continue
+            values = [COLUMNS[c](p) for c in names]
+            # Non-numeric values make the solver's filters raise -> out of appetite
+            # (model.appetite_score would read a missing TIV as 0; rare enough to drop)
+            if any(v is None for v in values):
+                continue
+            rows.append((values, float(p.get("total_premium", 0) or 0)))
+
+        self.n = len(rows)
+        self.premium = np.array([r[1] for r in rows], dtype=np.float64)
+        self.columns = {}
+        self.order = {}
+        for i, name in enumerate(names):
+            col = np.array([r[0][i] for r in rows], dtype=np.float64).reshape(self.n)
+            order = np.argsort(col, kind="stable")
+            self.columns[name] = col[order]  # sorted values
+            self.order[name] = order
+
+    def _bins(self, axis, thresholds):
+        """
+        Bin of each policy along one axis: the number of thresholds it is
+        "past", computed from cut positions in the pre-sorted column.
+        """
+        import numpy as np
+
+        column, op = AXES[axis]
+        sorted_col = self.columns[column]
+        # Cut position of each threshold in the sorted column: sorted positions
+        # at or after cut j are past threshold j ("<=" / ">" cut after equal values)
+        side = "left" if op in (">=", "<") else "right"
+        cuts = np.searchsorted(sorted_col, thresholds, side=side)
+        sorted_bins = np.repeat(np.arange(len(thresholds) + 1), np.diff(np.r_[0, cuts, self.n]))
+        bins = np.empty(self.n, dtype=np.int64)
+        bins[self.order[column]] = sorted_bins
+        return bins
+
+    def grid(self, **thresholds):
+        """
+        thresholds: axis name -> list of cutoffs (see AXES).
+        Returns {"axes": {name: sorted cutoffs}, "count": array, "premium": array}
+        where count[i, j, ...] is the number of base-passing policies that pass
+        cutoff i of the first axis, j of the second, and so on.
+        """
+        import numpy as np
+
+        unknown = [a for a in thresholds if a not in AXES]
+        if unknown:
+            raise ValueError(f"Unknown sweep axes {unknown}; choose from {sorted(AXES)}")
+
+        axes = {a: np.unique(np.asarray(t, dtype=np.float64)) for a, t in thresholds.items()}
+        shape = tuple(len(t) + 1 for t in axes.values())
+
+        flat = np.zeros(self.n, dtype=np.int64)
+        for axis, t in axes.items():
+            flat = flat * (len(t) + 1) + self._bins(axis, t)
+        size = int(np.prod(shape))
+        count = np.bincount(flat, minlength=size).reshape(shape).astype(np.int64)
+        premium = np.bincount(flat, weights=self.premium, minlength=size).reshape(shape)
+
+        for dim, axis in enumerate(axes):
+            op = AXES[axis][1]
+            if op in (">=", ">"):
+                # Passes cutoff j when its bin is > j: suffix sums, drop bin 0
+                count = np.flip(np.cumsum(np.flip(count, dim), dim), dim)
+                premium = np.flip(np.cumsum(np.flip(premium, dim), dim), dim)
+                index = slice(1, None)
+            else:
+                # Passes cutoff j when its bin is <= j: prefix sums, drop the last bin
+                count = np.cumsum(count, dim)
+                premium = np.cumsum(premium, dim)
+                index = slice(None, -1)
+            count = count[(slice(None),) * dim + (index,)]
+            premium = premium[(slice(None),) * dim + (index,)]
+
+        return {"axes": axes, "count": count, "premium": premium}
+
+
+def sweep_table(result):
+    """JSON-friendly form of a grid() result."""
+    return {
+        "axes": {a: t.tolist() for a, t in result["axes"].items()},
+        "count": result["count"].tolist(),
+        "premium": result["premium"].round(2).tolist(),
+    }
+
+
+def main(input_path="results/data.json", output_path="results/threshold_sweep.json", base="solver", **thresholds):
+    import json
+    import time
+
+    with open(input_path, "r") as f:
+        policies = json.load(f)["output"][0]["data"]
+
+    if not thresholds:
+        thresholds = {
+            "min_tiv": [0, 1e6, 5e6, 10e6, 25e6, 50e6, 100e6],
+            "max_loss_ratio": [0.1, 0.3, 0.5, 0.7, 1.0, 2.0],
+            "min_building_year": [1900, 1950, 1970, 1990, 2010],
+        }
+
+    start = time.perf_counter()
+    sweep = ThresholdSweep(policies, base=base)
+    built = time.perf_counter()
+    result = sweep.grid(**thresholds)
+    done = time.perf_counter()
+
+    with open(output_path, "w") as f:
+        json.dump({"base": base, "policies": sweep.n, **sweep_table(result)}, f, indent=2)
+
+    cells = result["count"].size
+    print(f"{sweep.n} policies pass the {base} base rules; {cells} threshold combinations "
+          f"(index {built - start:.3f}s, grid {(done - built) * 1000:.1f}ms)")
+    print(f"Saved {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Time-window score trends by created_at: count, premium, mean appetite score
+and mean risk score per day and per week, for every state x LOB (and the
+"*" rollups across states, LOBs and both).
+
+Tumbling windows are running sums per bucket. Each policy's contribution is
+remembered, so a new or changed policy moves only its own buckets (and a
+rescored one is subtracted before it is re-added); history is never
+re-bucketed. Sliding windows (e.g. trailing 7 or 30 days) are rolled over
+the daily buckets on demand, one add and one subtract per day.
+"""
+import hashlib
+import json
+import os
+from datetime import date, timedelta
+
+from .model import appetite_score
+from .risk_score import WEIGHT_PROFILES, calculate_risk_score
+
+ALL = "*"
+GRANULARITIES = ("day", "week")
+
+
+def _day(value):
+    if not isinstance(value, str) or len(value) < 10:
+        return None
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+
+
+def _week(day):
+    """Monday of the ISO week containing day."""
+    return day - timedelta(days=day.weekday())
+
+
+def _fingerprint(p):
+    return hashlib.blake2b(json.dumps(p, sort_keys=True).encode(), digest_size=8).hexdigest()
+
+
+def _groups(state, lob):
+    return ((state, lob), (state, ALL), (ALL, lob), (ALL, ALL))
+
+
+class TrendWindows:
+    def __init__(self, weights=WEIGHT_PROFILES["default"]):
+        self.weights = weights
+        # granularity -> bucket start (ISO date) -> "state|lob" -> [count, premium, appetite_sum, risk_sum]
+        self.buckets = {g: {} for g in GRANULARITIES}
+        # policy id -> [fingerprint, day, state, lob, premium, appetite, risk]; day None if undated
+        self.policies = {}
+
+    # ---------------------------
+    # Updates
+    # ---------------------------
+    def upsert(self, p):
+        """Add a policy or move a changed one; returns False if it was already counted as is."""
+        pid = str(p["id"])
+        fp = _fingerprint(p)
+        old = self.policies.get(pid)
+        if old is not None and old[0] == fp:
+            return False
+        if old is not None:
+            self._apply(old, -1)
+            del self.policies[pid]
+
+        day = _day(p.get("created_at"))
+        if day is None:
+            self.policies[pid] = [fp, None, None, None, 0.0, 0, 0]
+            return True
+        try:
+            premium = float(p.get("total_premium") or 0)
+        except (TypeError, ValueError):
+            premium = 0.0
+        row = [fp, day.isoformat(), p.get("primary_risk_state") or "?", p.get("line_of_business") or "?",
+               premium, appetite_score(p), calculate_risk_score(p, self.weights)]
+        self.policies[pid] = row
+        self._apply(row, 1)
+        return True
+
+    def remove(self, policy_id):
+        row = self.policies.pop(str(policy_id), None)
+        if row is not None:
+            self._apply(row, -1)
+
+    @property
+    def undated(self):
+        return sum(row[1] is None for row in self.policies.values())
+
+    def _apply(self, row, sign):
+        _, day, state, lob, premium, appetite, risk = row
+        if day is None:
+            return
+        d = date.fromisoformat(day)
+        for granularity, start in (("day", day), ("week", _week(d).isoformat())):
+            bucket = self.buckets[granularity].setdefault(start, {})
+            for s, l in _groups(state, lob):
+                key = f"{s}|{l}"
+                sums = bucket.setdefault(key, [0, 0.0, 0.0, 0.0])
+                sums[0] += sign
+                sums[1] += sign * premium
+                sums[2] += sign * appetite
+                sums[3] += sign * risk
+                if sums[0] == 0:
+                    del bucket[key]  # empty again: drop it (and any float residue)
+            if not bucket:
+                del self.buckets[granularity][start]
+
+    def update(self, policies, prune=False):
+        """
+        Apply a drop of policies. Only new or changed ones touch the windows.
+        prune treats the drop as the full book and removes policies missing from it.
+        Returns (changed, removed).
+        """
+        seen = set()
+        changed = 0
+        for p in policies:
+            seen.add(str(p["id"]))
+            changed += self.upsert(p)
+        removed = 0
+        if prune:
+            for pid in [pid for pid in self.policies if pid not in seen]:
+                self.remove(pid)
+                removed += 1
+        return changed, removed
+
+    # ---------------------------
+    # Series
+    # ---------------------------
+    @staticmethod
+    def _row(start, sums):
+        count, premium, appetite, risk = sums
+        return {
+            "start": start,
+            "count": count,
+            "premium": round(premium, 2),
+            "mean_appetite": round(appetite / count, 2) if count else None,
+            "mean_risk": round(risk / count, 2) if count else None,
+        }
+
+    def _steps(self, granularity, state, lob, start, end):
+        """(bucket start, sums) for every bucket from start to end, empty ones included."""
+        buckets = self.buckets[granularity]
+        if not buckets:
+            return
+        step = timedelta(days=1 if granularity == "day" else 7)
+        first = date.fromisoformat(start or min(buckets))
+        last = date.fromisoformat(end or max(buckets))
+        if granularity == "week":
+            first = _week(first)
+        key = f"{state}|{lob}"
+        d = first
+        while d <= last:
+            iso = d.isoformat()
+            yield iso, buckets.get(iso, {}).get(key, (0, 0.0, 0.0, 0.0))
+            d += step
+
+    def series(self, granularity="day", state=ALL, lob=ALL, start=None, end=None, dense=True):
+        """
+        Tumbling-window rows for one state/LOB group (ALL = every state / LOB).
+        dense=False leaves out empty buckets (count 0).
+        """
+        steps = self._steps(granularity, state, lob, start, end)
+        return [self._row(s, sums) for s, sums in steps if dense or sums[0]]
+
+    def sliding(self, days=7, state=ALL, lob=ALL, start=None, end=None):
+        """Trailing `days`-day window ending on each day, rolled over the daily buckets."""
+        steps = list(self._steps("day", state, lob, None, end))
+        window = [0, 0.0, 0.0, 0.0]
+        rows = []
+        for i, (day, sums) in enumerate(steps):
+            for f in range(4):
+                window[f] += sums[f]
+            if i >= days:
+                for f in range(4):
+                    window[f] -= steps[i - days][1][f]
+            if start is None or day >= start:
+                rows.append(self._row(day, window))
+        return rows
+
+    def groups(self):
+        """Every (state, lob) pair present in the windows."""
+        keys = {k for g in self.buckets.values() for bucket in g.values() for k in bucket}
+        return sorted(tuple(k.split("|", 1)) for k in keys)
+
+    # ---------------------------
+    # Persistence
+    # ---------------------------
+    def to_json(self):
+        return {"buckets": self.buckets, "policies": self.policies}
+
+    @classmethod
+    def from_json(cls, data, weights=WEIGHT_PROFILES["default"]):
+        trends = cls(weights)
+        trends.buckets.update(data["buckets"])
+        trends.policies = data["policies"]
+        return trends
+
+
+def state_path(output_path):
+    """results/trends.json -> results/trends.state.json"""
+    return os.path.splitext(output_path)[0] + ".state.json"
+
+
+def load(output_path):
+    """The windows saved next to output_path, or empty ones."""
+    try:
+        with open(state_path(output_path), "r") as f:
+            return TrendWindows.from_json(json.load(f))
+    except FileNotFoundError:
+        return TrendWindows()
+
+
+def chart_data(trends, sliding_days=(7, 30)):
+    """
+    What the trend charts read: tumbling series per group, sliding series for
+    the rollup. Only non-empty buckets are listed (a missing date means count 0),
+    so the payload grows with the buckets that exist, not days x groups.
+    """
+    groups = trends.groups()
+    return {
+        "groups": [list(g) for g in groups],
+        "day": {f"{s}|{l}": trends.series("day", s, l, dense=False) for s, l in groups},
+        "week": {f"{s}|{l}": trends.series("week", s, l, dense=False) for s, l in groups},
+        "sliding": {str(n): [r for r in trends.sliding(n) if r["count"]] for n in sliding_days},
+    }
+
+
+def main(input_path="results/data.json", output_path="results/trends.json", prune=False):
+    from .data_grouper import iter_policies
+    from .snapshots import atomic_write_json, publish
+
+    trends = load(output_path)
+    changed, removed = trends.update(iter_policies(input_path), prune=prune)
+    atomic_write_json(state_path(output_path), trends.to_json())
+    publish(output_path, chart_data(trends), indent=None)
+    print(f"{changed} policies added/changed, {removed} removed; {len(trends.policies)} tracked "
+          f"({trends.undated} without created_at) -> {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+from .account_state import AccountBook
+from .explanations import annotate as annotate_explanations
+from .snapshots import load, publish
+
+# Derived fields that the pipeline adds on top of the input policy
+DERIVED_FIELDS = ("score", "risk_score")
+
+
+def load_policies(path):
+    with open(path, "r") as f:
+        data = json.load(f)
+    return {p["id"]: p for p in data["output"][0]["data"]}
+
+
+def seed_from_snapshot(snapshot):
+    """Scored policies ({id: policy}) from a previous enhanced output, derived fields stripped."""
+    scored = {}
+    for account in snapshot.get("accounts", {}).values():
+        for p in account.get("policies", {}).values():
+            scored[p["id"]] = {k: v for k, v in p.items() if k not in DERIVED_FIELDS}
+    return scored
+
+
+def find_changes(scored, current):
+    """
+    Compare the input export against what has been scored.
+    A policy is changed if it is new or any of its input fields differ.
+    Returns (changed_ids, removed_ids).
+    """
+    changed = [
+        pid for pid, p in current.items()
+        if pid not in scored or any(scored[pid].get(k) != v for k, v in p.items())
+    ]
+    removed = [pid for pid in scored if pid not in current]
+    return changed, removed
+
+
+def _pointer(account_name):
+    """JSON Pointer for an account in the snapshot (RFC 6901 escaping)."""
+    return "/accounts/" + account_name.replace("~", "~0").replace("/", "~1")
+
+
+def apply_changes(snapshot, scored, current, changed, removed, score_fn, book=None):
+    """
+    Rescore only the changed policies and update only the accounts they
+    touch. Updates scored, book and snapshot in place and returns the JSON
+    Patch operations that turn the old snapshot into the new one.
+
+    score_fn(policies) must set cohere_relevance (and relevance_engine) on each;
+    changed policies then get a fresh score_breakdown and template justification.
+    book is the AccountBook over scored; pass the same one on every call so
+    account aggregates are maintained per policy instead of rebuilt.
+    """
+    if book is None:
+        book = AccountBook.from_policies(scored.values())
+
+    affected = set()
+    for pid in removed:
+        affected.add(book.remove(pid))
+        del scored[pid]
+
+    # Fresh copies: stale LLM justifications are not carried over to changed policies
+    fresh = [dict(current[pid]) for pid in changed]
+    if fresh:
+        score_fn(fresh)
+        annotate_explanations(fresh)
+    for p in fresh:
+        scored[p["id"]] = p
+        affected |= book.upsert(p)
+
+    accounts = snapshot.setdefault("accounts", {})
+    patch = []
+    for acc in sorted(affected):
+        state = book.get(acc)
+        if state is None:
+            if acc in accounts:
+                del accounts[acc]
+                patch.append({"op": "remove", "path": _pointer(acc)})
+            continue
+        op = "replace" if acc in accounts else "add"
+        accounts[acc] = state.entry()
+        # Round-trip so the patch value matches what the snapshot file holds (string ids)
+        patch.append({"op": op, "path": _pointer(acc), "value": json.loads(json.dumps(accounts[acc]))})
+
+    return patch
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _wait_for_change(path, last_sig, interval):
+    """
+    Block until path looks different from last_sig. Uses inotify when the
+    optional inotify_simple package is available, otherwise polls os.stat.
+    """
+    try:
+        from inotify_simple import INotify, flags
+    except ImportError:
+        INotify = None
+
+    if INotify is None:
+        while _file_signature(path) == last_sig:
+            time.sleep(interval)
+        return _file_signature(path)
+
+    name = os.path.basename(path)
+    with INotify() as inotify:
+        inotify.add_watch(os.path.dirname(path) or ".", flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE)
+        # The file may have changed between the last read and add_watch
+        while _file_signature(path) == last_sig:
+            for event in inotify.read(timeout=int(interval * 1000)):
+                if event.name == name:
+                    break
+    return _file_signature(path)
+
+
+def watch(input_path, output_path, delta_path, score_fn, interval=1.0, once=False):
+    """
+    Long-running watch mode: whenever input_path changes, rescore the changed
+    policies, publish the full snapshot at output_path (see snapshots) and append one NDJSON
+    line {"version", "timestamp", "patch"} with the JSON Patch to delta_path. "version" is
+    the snapshot version publish() recorded in the manifest.
+    """
+    snapshot = {"accounts": {}}
+    if os.path.exists(output_path):
+        snapshot = load(output_path)
+        snapshot.pop("version", None)  # older watch runs kept their own counter here
+    scored = seed_from_snapshot(snapshot)
+    book = AccountBook.from_policies(scored.values())
+
+    sig = None
+    while True:
+        sig = _wait_for_change(input_path, sig, interval)
+        if sig is None:
+            continue  # input missing; keep waiting
+
+        try:
+            current = load_policies(input_path)
+        except (json.JSONDecodeError, KeyError, IndexError):
+            continue  # partially written export; try again on the next change
+
+        changed, removed = find_changes(scored, current)
+        if changed or removed:
+            start = time.perf_counter()
+            patch = apply_changes(snapshot, scored, current, changed, removed, score_fn, book)
+            version = publish(output_path, snapshot, indent=4)
+            with open(delta_path, "a") as f:
+                f.write(json.dumps({
+                    "version": version,
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "patch": patch,
+                }) + "\n")
+
+            print(f"v{version}: {len(changed)} changed, {len(removed)} removed, "
+                  f"{len(patch)} accounts updated in {time.perf_counter() - start:.2f}s")
+
+        if once:
+            return snapshot
+
+
+def main(input_path="results/data.json", output_path="results/enhanced_data.json"):
+    from .cohere_client import get_client
+    from .guidelines import GUIDELINES
+    from .policy_docs import policy_yaml
+    from .rerank import rerank_with_fallback
+
+    delta_path = os.path.splitext(output_path)[0] + ".deltas.ndjson"
+    co = get_client()
+
+    def score_fn(policies):
+        scores, engine = rerank_with_fallback(co, GUIDELINES, [policy_yaml(p) for p in policies])
+        for p, score in zip(policies, scores):
+            p["cohere_relevance"] = score
+            p["relevance_engine"] = engine
+
+    print(f"Watching {input_path} -> {output_path} (+ {delta_path})")
+    watch(input_path, output_path, delta_path, score_fn)
+
+
+if __name__ == "__main__":
+    import sys
+
+    main(*sys.argv[1:])